@@ -8,6 +8,8 @@ Data: 2024
 
 import streamlit as st
 import pandas as pd
+import hashlib
+import io
 import sys
 from pathlib import Path
 
@@ -17,12 +19,16 @@ sys.path.insert(0, str(root_path))
 
 from src.data_processing import (
     load_and_validate_csv,
+    load_clean_concat,
     clean_and_transform_data,
     calculate_derived_fields,
-    get_data_summary
+    get_data_summary,
+    LARGE_FILE_BYTES
 )
 from src.visualizations import (
     render_kpi_section,
+    clear_visualization_caches,
+    calculate_filter_options,
     build_filter_sidebar,
     apply_filters,
     format_display_table,
@@ -46,7 +52,7 @@ st.set_page_config(
 # CSS CUSTOMIZADO PARA LAYOUT COMPACTO
 # =====================================================================
 
-st.markdown("""
+CSS_STRING = """
 <style>
     /* Reduz padding geral dos containers */
     .block-container {
@@ -162,7 +168,118 @@ st.markdown("""
         color: #2D3142 !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Reenviado a cada rerun: o Streamlit remove elementos que não são
+# renderizados novamente, então um guard "uma vez por sessão" perderia o CSS
+st.markdown(CSS_STRING, unsafe_allow_html=True)
+
+
+# =====================================================================
+# PIPELINE DE DADOS
+# =====================================================================
+
+def _load_pipeline(file_bytes: bytes) -> pd.DataFrame:
+    """
+    Executa o pipeline completo (carga, limpeza e campos derivados)
+
+    Chamado só quando o arquivo muda: o resultado fica apenas no session
+    state (st.session_state.data, com o hash em data_key). Não usa
+    st.cache_data, que guardaria uma cópia de cada base enviada,
+    compartilhada entre sessões, até o fim do processo do servidor.
+
+    Args:
+        file_bytes: Conteúdo bruto do arquivo
+
+    Returns:
+        DataFrame processado
+    """
+    if len(file_bytes) > LARGE_FILE_BYTES:
+        # Arquivos grandes: leitura e limpeza em blocos
+        processed_data = load_clean_concat(io.BytesIO(file_bytes), delimiter=';')
+    else:
+        raw_data = load_and_validate_csv(io.BytesIO(file_bytes), delimiter=';')
+        processed_data = clean_and_transform_data(raw_data)
+    return calculate_derived_fields(processed_data)
+
+
+def _filtered_display(data_key: str, filters_key: tuple, df: pd.DataFrame) -> tuple:
+    """
+    Aplica os filtros e formata a tabela detalhada, reaproveitando o último resultado
+
+    O par (filtrado, formatado) fica no session state junto com a chave
+    (dataset + filtros): reruns que não alteram os filtros (navegação,
+    botões) o reaproveitam. Não usa st.cache_data porque ele guarda uma
+    cópia serializada por entrada, compartilhada entre sessões (com os
+    filtros padrão, a base inteira), e desserializa a cada leitura.
+
+    Args:
+        data_key: Hash do arquivo carregado
+        filters_key: Itens do dicionário de filtros, ordenados
+        df: DataFrame completo
+
+    Returns:
+        Tupla (DataFrame filtrado, DataFrame formatado para exibição);
+        somente leitura
+    """
+    cache_key = (data_key, filters_key)
+    cached = st.session_state.get('filtered_display')
+    if cached is not None and cached[0] == cache_key:
+        return cached[1]
+
+    filtered_df = apply_filters(df, dict(filters_key))
+    result = (filtered_df, format_display_table(filtered_df))
+    st.session_state.filtered_display = (cache_key, result)
+    return result
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _export_csv(data_key: str, filters_key: tuple, _df: pd.DataFrame) -> bytes:
+    """
+    Gera os bytes do CSV de exportação, com cache por filtro
+
+    Evita serializar o DataFrame filtrado a cada rerun só para montar o
+    botão de download.
+
+    Args:
+        data_key: Hash do arquivo carregado (chave do cache)
+        filters_key: Itens do dicionário de filtros, ordenados (chave do cache)
+        _df: DataFrame filtrado (não entra no hash)
+
+    Returns:
+        Conteúdo do CSV em UTF-8 com BOM
+    """
+    return _df.to_csv(sep=';', index=False).encode('utf-8-sig')
+
+
+def _build_meta(df: pd.DataFrame) -> dict:
+    """
+    Metadados do dataset usados a cada rerun (calculados uma vez por carga)
+
+    Args:
+        df: DataFrame processado
+
+    Returns:
+        Dicionário com nº de TECs distintos, nº de linhas e colunas
+    """
+    return {
+        'tec_nunique': df['tec'].nunique() if 'tec' in df.columns else 0,
+        'n_rows': len(df),
+        'cols': list(df.columns)
+    }
+
+
+def _set_page(page: str) -> None:
+    """
+    Callback dos botões de navegação
+
+    Roda antes do script, então a página e o destaque do botão já saem
+    corretos no mesmo rerun do clique (sem st.rerun extra).
+
+    Args:
+        page: Identificador da página de destino
+    """
+    st.session_state.current_page = page
 
 
 # =====================================================================
@@ -172,6 +289,18 @@ st.markdown("""
 if 'data' not in st.session_state:
     st.session_state.data = None
 
+if 'data_key' not in st.session_state:
+    st.session_state.data_key = None
+
+if 'summary' not in st.session_state:
+    st.session_state.summary = None
+
+if 'meta' not in st.session_state:
+    st.session_state.meta = None
+
+if 'filter_options' not in st.session_state:
+    st.session_state.filter_options = None
+
 if 'filters' not in st.session_state:
     st.session_state.filters = {}
 
@@ -194,28 +323,27 @@ st.sidebar.caption("Versão 1.0 | 2024")
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 📑 Navegação")
 
-# 3 botões empilhados verticalmente
-if st.sidebar.button("📤 Upload de Dados", use_container_width=True, type="primary" if st.session_state.current_page == 'upload' else "secondary"):
-    st.session_state.current_page = 'upload'
-    st.rerun()
+# Botões empilhados verticalmente
+st.sidebar.button("📤 Upload de Dados", use_container_width=True, type="primary" if st.session_state.current_page == 'upload' else "secondary",
+                  on_click=_set_page, args=('upload',))
 
-if st.sidebar.button("📊 Visão Geral", use_container_width=True, type="primary" if st.session_state.current_page == 'visao_geral' else "secondary"):
-    st.session_state.current_page = 'visao_geral'
-    st.rerun()
+st.sidebar.button("📊 Visão Geral", use_container_width=True, type="primary" if st.session_state.current_page == 'visao_geral' else "secondary",
+                  on_click=_set_page, args=('visao_geral',))
 
-if st.sidebar.button("📈 Análise Estratégica", use_container_width=True, type="primary" if st.session_state.current_page == 'analise_estrategica' else "secondary"):
-    st.session_state.current_page = 'analise_estrategica'
-    st.rerun()
+st.sidebar.button("📈 Análise Estratégica", use_container_width=True, type="primary" if st.session_state.current_page == 'analise_estrategica' else "secondary",
+                  on_click=_set_page, args=('analise_estrategica',))
 
-if st.sidebar.button("📊 Simulação", use_container_width=True, type="primary" if st.session_state.current_page == 'simulacao' else "secondary"):
-    st.session_state.current_page = 'simulacao'
-    st.rerun()
+st.sidebar.button("📊 Simulação", use_container_width=True, type="primary" if st.session_state.current_page == 'simulacao' else "secondary",
+                  on_click=_set_page, args=('simulacao',))
 
 st.sidebar.markdown("---")
 
 if st.session_state.data is not None:
     st.sidebar.success("✅ Dados carregados")
-    summary = get_data_summary(st.session_state.data)
+    # Resumo calculado uma vez por carga de dados (memory_usage deep é caro)
+    if st.session_state.summary is None:
+        st.session_state.summary = get_data_summary(st.session_state.data)
+    summary = st.session_state.summary
 
     st.sidebar.metric("📊 Linhas", f"{summary['row_count']:,}".replace(',', '.'))
     st.sidebar.metric("📋 Colunas", summary['column_count'])
@@ -249,18 +377,21 @@ if st.session_state.current_page == 'upload':
 
     if uploaded_file is not None:
         try:
-            # Carrega e processa automaticamente
-            with st.spinner("⚙️ Carregando e processando dados..."):
-                # Carrega o CSV
-                raw_data = load_and_validate_csv(uploaded_file, delimiter=';')
-
-                # Processa os dados automaticamente
-                processed_data = clean_and_transform_data(raw_data)
-                processed_data = calculate_derived_fields(processed_data)
-
-                # Armazena no session state
-                st.session_state.data = processed_data
-                st.session_state.data_loaded = True
+            file_bytes = uploaded_file.getvalue()
+            file_hash = hashlib.sha1(file_bytes).hexdigest()
+
+            # Só reprocessa quando o arquivo muda (reruns reaproveitam o session state)
+            if st.session_state.data_key != file_hash or st.session_state.data is None:
+                with st.spinner("⚙️ Carregando e processando dados..."):
+                    # Carrega e processa o CSV
+                    st.session_state.data = _load_pipeline(file_bytes)
+                    st.session_state.data_key = file_hash
+                    st.session_state.summary = get_data_summary(st.session_state.data)
+                    st.session_state.meta = _build_meta(st.session_state.data)
+                    st.session_state.filter_options = calculate_filter_options(st.session_state.data)
+                    st.session_state.data_loaded = True
+
+            processed_data = st.session_state.data
 
             # Mensagem de sucesso
             st.success("✅ Dados carregados e processados com sucesso!")
@@ -328,15 +459,22 @@ if st.session_state.current_page == 'visao_geral':
         df = st.session_state.data
 
         # ===== FILTROS NA SIDEBAR =====
-        filters = build_filter_sidebar(df)
+        # (opções dos filtros calculadas uma vez por carga e mantidas no session state)
+        if st.session_state.filter_options is None:
+            st.session_state.filter_options = calculate_filter_options(df)
+        filters = build_filter_sidebar(df, options=st.session_state.filter_options)
         st.session_state.filters = filters
 
-        # ===== APLICA FILTROS =====
-        filtered_df = apply_filters(df, filters)
+        # ===== APLICA FILTROS (e formata a tabela, em cache por filtro) =====
+        filters_key = tuple(sorted(filters.items()))
+        filtered_df, display_df = _filtered_display(st.session_state.data_key, filters_key, df)
 
         # Verifica se há filtros ativos
+        if st.session_state.meta is None:
+            st.session_state.meta = _build_meta(df)
+
         filters_active = (
-            len(filters.get('tec', [])) < df['tec'].nunique() if 'tec' in df.columns else False
+            len(filters.get('tec', [])) < st.session_state.meta['tec_nunique'] if 'tec' in df.columns else False
         ) or (
             len(filters.get('status_mapeamento', [])) < 2
         )
@@ -365,16 +503,13 @@ if st.session_state.current_page == 'visao_geral':
                 """.replace(',', '.'), unsafe_allow_html=True)
 
             # ===== SEÇÃO 1: KPIs =====
-            render_kpi_section(filtered_df, filters_active)
+            render_kpi_section(filtered_df, filters_active, cache_key=(st.session_state.data_key, filters_key))
 
             st.markdown("---")
 
             # ===== SEÇÃO 2: TABELA DETALHADA =====
             st.header("📋 Detalhamento das Minas")
 
-            # Formata a tabela
-            display_df = format_display_table(filtered_df)
-
             # Mostra a tabela
             st.dataframe(
                 display_df,
@@ -388,7 +523,7 @@ if st.session_state.current_page == 'visao_geral':
 
             with col2:
                 # Botão de download CSV
-                csv_data = filtered_df.to_csv(sep=';', index=False, encoding='utf-8-sig')
+                csv_data = _export_csv(st.session_state.data_key, filters_key, filtered_df)
                 st.download_button(
                     label="📥 Exportar CSV",
                     data=csv_data,
@@ -401,8 +536,16 @@ if st.session_state.current_page == 'visao_geral':
                 # Botão de limpar dados
                 if st.button("🗑️ Limpar Dados", use_container_width=True):
                     st.session_state.data = None
+                    st.session_state.data_key = None
+                    st.session_state.summary = None
+                    st.session_state.meta = None
+                    st.session_state.filter_options = None
                     st.session_state.data_loaded = False
                     st.session_state.filters = {}
+                    st.session_state.simulacao_filtrada = None
+                    st.session_state.filtered_display = None
+                    _export_csv.clear()
+                    clear_visualization_caches()
                     st.rerun()
 
 
@@ -443,7 +586,7 @@ if st.session_state.current_page == 'analise_estrategica':
         st.markdown("---")
 
         # Renderiza as 3 seções
-        render_analise_estrategica_section(df)
+        render_analise_estrategica_section(df, cache_key=st.session_state.data_key)
 
 
 # Página de Simulação de Potencial
@@ -474,7 +617,11 @@ if st.session_state.current_page == 'simulacao':
         """)
     else:
         df = st.session_state.data
-        render_simulacao_section(df)
+
+        # Mesmas opções de filtro da Visão Geral (uma vez por carga)
+        if st.session_state.filter_options is None:
+            st.session_state.filter_options = calculate_filter_options(df)
+        render_simulacao_section(df, options=st.session_state.filter_options, cache_key=st.session_state.data_key)
 
 
 # =====================================================================
@@ -3,12 +3,204 @@ Módulo de processamento de dados CFEM-CRM
 Responsável por carregar, limpar e transformar dados CSV
 """
 
+import codecs
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 from datetime import datetime
 from typing import Optional
 
 
+# Números aceitos pelo parser vetorizado (demais casos usam o caminho escalar)
+_NUMBER_PATTERN = r'^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$'
+
+# Colunas de baixa cardinalidade convertidas para category após a limpeza
+CATEGORY_COLUMNS = [
+    'tec',
+    'primeiro_escopo',
+    'substanciamaiscomercializada',
+    'setormineral',
+    'uf',
+    'município',
+    'pai',
+    'terceiriza_lavra?'
+]
+
+# Colunas de texto de alta cardinalidade (só exibidas) guardadas em Arrow
+TEXT_COLUMNS = [
+    'chaveprimaria',
+    'empresa_por_cnpj',
+    'município'
+]
+
+
+def _arrow_text_dtype():
+    """
+    Dtype de texto em Arrow com nulos como NaN (mesma semântica do object)
+
+    Returns:
+        StringDtype com armazenamento pyarrow, ou None em pandas < 2.1
+    """
+    try:
+        # pandas >= 2.3
+        return pd.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        pass
+    try:
+        # pandas 2.1 e 2.2
+        return pd.StringDtype('pyarrow_numpy')
+    except (TypeError, ValueError):
+        return None
+
+
+ARROW_TEXT_DTYPE = _arrow_text_dtype()
+
+# Valores possíveis de status_mapeamento
+STATUS_CATEGORIES = ['Não', 'Sim']
+
+# Colunas brutas lidas sempre como texto (conversão vetorizada posterior).
+# Só o CPF/CNPJ: as colunas de valor mantêm a inferência numérica do
+# pandas (1500.75 e 1.500 continuam 1500.75 e 1.5, como na leitura
+# original); só as colunas que chegam como texto ("1.234,56") passam pela
+# troca de separadores brasileiros
+RAW_TEXT_COLUMNS = {
+    'CPF_CNPJ': str
+}
+
+# Marcadores de nulo do pandas.read_csv (mesmos nos dois leitores)
+CSV_NA_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null'
+]
+
+# Arquivos acima deste tamanho são lidos em blocos (limita o pico de memória)
+LARGE_FILE_BYTES = 100 * 1024 * 1024
+CSV_CHUNK_ROWS = 200_000
+
+
+def is_missing(value) -> bool:
+    """
+    Verifica se um valor escalar é nulo (None, pd.NA ou NaN)
+
+    Equivale a pd.isna para escalares, sem o custo da chamada genérica,
+    que pesa nas funções de formatação chamadas célula a célula.
+
+    Args:
+        value: Valor escalar
+
+    Returns:
+        True se o valor for nulo
+    """
+    return value is None or value is pd.NA or (isinstance(value, (float, np.floating)) and value != value)
+
+
+def detect_csv_encoding(file_object, block_size: int = 1024 * 1024) -> str:
+    """
+    Detecta o encoding do CSV antes da leitura
+
+    Valida o conteúdo como UTF-8 em blocos (sem decodificar o arquivo
+    inteiro de uma vez); se algum byte for inválido, o arquivo é latin-1.
+
+    Args:
+        file_object: Objeto de arquivo do Streamlit (ou BytesIO)
+        block_size: Tamanho dos blocos validados
+
+    Returns:
+        'utf-8-sig' (aceita arquivos com ou sem BOM) ou 'latin-1'
+    """
+    if hasattr(file_object, 'getvalue'):
+        raw = file_object.getvalue()
+    else:
+        raw = file_object.read()
+        file_object.seek(0)
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    view = memoryview(raw)
+
+    try:
+        for start in range(0, len(view), block_size):
+            decoder.decode(view[start:start + block_size])
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+    return 'utf-8-sig'
+
+
+def _read_csv_arrow(file_object, delimiter: str, encoding: str) -> Optional[pd.DataFrame]:
+    """
+    Lê o CSV com o leitor multithread do PyArrow
+
+    O resultado é o mesmo do parser C com dtype=RAW_TEXT_COLUMNS:
+    - as colunas de RAW_TEXT_COLUMNS são declaradas como texto dentro do
+      Arrow (o engine='pyarrow' do pandas infere o tipo e só aplica o dtype
+      depois: inteiros com células vazias viravam '1234.0');
+    - colunas que o Arrow interpreta como data/hora ('2024-01-05', '12:30')
+      são relidas como texto, já que o parser C não converte datas;
+    - booleanos só a partir de True/False, como no pandas.
+
+    Args:
+        file_object: Objeto de arquivo do Streamlit (ou BytesIO)
+        delimiter: Delimitador do CSV
+        encoding: Encoding do arquivo
+
+    Returns:
+        DataFrame bruto, ou None se o cabeçalho tiver nomes repetidos (o
+        parser C os renomeia para 'nome.1' e deve ser usado)
+
+    Raises:
+        pa.ArrowInvalid: Linhas irregulares ou conteúdo inválido
+    """
+    def read(**convert_kwargs) -> pa.Table:
+        file_object.seek(0)
+        return pa_csv.read_csv(
+            file_object,
+            read_options=pa_csv.ReadOptions(encoding=encoding),
+            parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+            convert_options=pa_csv.ConvertOptions(
+                null_values=CSV_NA_VALUES,
+                strings_can_be_null=True,
+                true_values=['True', 'TRUE', 'true'],
+                false_values=['False', 'FALSE', 'false'],
+                **convert_kwargs
+            )
+        )
+
+    table = read(column_types={col: pa.string() for col in RAW_TEXT_COLUMNS})
+
+    names = table.column_names
+    if len(set(names)) != len(names):
+        return None
+
+    # Datas/horas inferidas pelo Arrow: relê só essas colunas como texto
+    temporal = [name for name, arrow_type in zip(names, table.schema.types)
+                if pa.types.is_temporal(arrow_type)]
+    if temporal:
+        as_text = read(include_columns=temporal, column_types={col: pa.string() for col in temporal})
+        for col in temporal:
+            table = table.set_column(names.index(col), col, as_text[col])
+
+    # Colunas 100% vazias: float64, como no pandas
+    schema = table.schema
+    for i, arrow_type in enumerate(schema.types):
+        if pa.types.is_null(arrow_type):
+            schema = schema.set(i, schema.field(i).with_type(pa.float64()))
+
+    df = table.cast(schema).to_pandas()
+
+    # Nulos de texto chegam como None; o parser C usa NaN (atribuição direta
+    # no array: fillna converteria uma coluna toda vazia em float)
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = np.nan
+        df[col] = values
+
+    return df
+
+
 def load_and_validate_csv(file_object, delimiter: str = ';') -> pd.DataFrame:
     """
     Carrega arquivo CSV com tratamento de encoding
@@ -20,13 +212,23 @@ def load_and_validate_csv(file_object, delimiter: str = ';') -> pd.DataFrame:
     Returns:
         DataFrame bruto
     """
-    try:
-        # Tenta UTF-8 com BOM primeiro
-        df = pd.read_csv(file_object, delimiter=delimiter, encoding='utf-8-sig')
-    except UnicodeDecodeError:
-        # Fallback para latin-1
-        file_object.seek(0)
-        df = pd.read_csv(file_object, delimiter=delimiter, encoding='latin-1')
+    encoding = detect_csv_encoding(file_object)
+
+    if encoding == 'latin-1':
+        # latin-1: parser C (o leitor do PyArrow trabalha em UTF-8)
+        df = pd.read_csv(file_object, delimiter=delimiter, encoding=encoding, dtype=RAW_TEXT_COLUMNS)
+    else:
+        try:
+            # UTF-8 (com ou sem BOM): leitor multithread do PyArrow
+            df = _read_csv_arrow(file_object, delimiter, encoding)
+        except pa.ArrowInvalid:
+            df = None
+
+        if df is None:
+            # Linhas irregulares (o parser C completa colunas faltantes com
+            # NaN) ou cabeçalho repetido (renomeado para 'nome.1')
+            file_object.seek(0)
+            df = pd.read_csv(file_object, delimiter=delimiter, encoding=encoding, dtype=RAW_TEXT_COLUMNS)
 
     # Remove linhas completamente vazias
     df = df.dropna(how='all')
@@ -44,7 +246,7 @@ def transform_cpf_cnpj(value) -> str:
     Returns:
         String formatada com 14 dígitos (ex: "03360000000191")
     """
-    if pd.isna(value) or value == "":
+    if is_missing(value) or value == "":
         return ""
 
     try:
@@ -69,6 +271,52 @@ def transform_cpf_cnpj(value) -> str:
         return str(value)
 
 
+def _vec_cpf_cnpj(s: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de transform_cpf_cnpj para uma coluna inteira
+
+    Converte em lote (PyArrow) os valores numéricos, inclusive em notação
+    científica, e usa a função escalar apenas nas linhas que não puderem ser
+    convertidas, preservando exatamente o mesmo resultado.
+
+    Args:
+        s: Série com CPF/CNPJ brutos
+
+    Returns:
+        Série de strings com 14 dígitos
+    """
+    if pd.api.types.is_numeric_dtype(s):
+        num = s.to_numpy(dtype='float64', na_value=np.nan)
+        empty = np.isnan(num)
+    elif pd.api.types.infer_dtype(s, skipna=True) in ('string', 'empty'):
+        raw = pa.array(s, type=pa.string(), from_pandas=True)
+        empty = pc.fill_null(pc.equal(raw, ''), True).to_numpy(zero_copy_only=False)
+        arr = pc.utf8_trim_whitespace(raw)
+
+        # Sem notação científica, pontos e vírgulas são removidos
+        plain = pc.replace_substring(pc.replace_substring(arr, '.', ''), ',', '')
+        cleaned = pc.if_else(pc.match_substring(arr, 'e', ignore_case=True), arr, plain)
+
+        parseable = pc.match_substring_regex(cleaned, _NUMBER_PATTERN)
+        num = pc.cast(pc.if_else(parseable, cleaned, None), pa.float64()).to_numpy(zero_copy_only=False)
+    else:
+        # Coluna mista (números e textos): mantém o caminho escalar
+        return s.apply(transform_cpf_cnpj)
+
+    # Fora do intervalo seguro de int64 (ou negativo) cai no caminho escalar
+    valid = ~np.isnan(num) & (num >= 0) & (num < 1e18) & ~empty
+
+    result = np.full(len(s), "", dtype=object)
+    digits = pa.array(num[valid].astype(np.int64))
+    result[valid] = pc.utf8_lpad(pc.cast(digits, pa.string()), 14, '0').to_numpy(zero_copy_only=False)
+
+    fallback = ~valid & ~empty
+    if fallback.any():
+        result[fallback] = [transform_cpf_cnpj(v) for v in s.to_numpy()[fallback]]
+
+    return pd.Series(result, index=s.index, dtype=object)
+
+
 def convert_brazilian_decimal(value) -> float:
     """
     Converte formato brasileiro de decimal para float
@@ -80,7 +328,7 @@ def convert_brazilian_decimal(value) -> float:
     Returns:
         Float ou NaN se inválido
     """
-    if pd.isna(value) or value == "" or value == "#N/D":
+    if is_missing(value) or value == "" or value == "#N/D":
         return np.nan
 
     try:
@@ -100,18 +348,56 @@ def convert_brazilian_decimal(value) -> float:
         return np.nan
 
 
-def clean_and_transform_data(df: pd.DataFrame) -> pd.DataFrame:
+def _vec_br_decimal(s: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de convert_brazilian_decimal para uma coluna inteira
+
+    Remove separadores de milhares e troca a vírgula decimal em lote
+    (PyArrow); apenas valores fora do padrão numérico usam a função escalar.
+
+    Args:
+        s: Série com valores em formato brasileiro
+
+    Returns:
+        Série float64 (NaN se inválido)
+    """
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype('float64')
+
+    if pd.api.types.infer_dtype(s, skipna=True) not in ('string', 'empty'):
+        # Coluna mista (números e textos): mantém o caminho escalar
+        return s.apply(convert_brazilian_decimal).astype('float64')
+
+    arr = pc.utf8_trim_whitespace(pa.array(s, type=pa.string(), from_pandas=True))
+    empty = pc.fill_null(pc.is_in(arr, pa.array(['', '#N/D'])), True).to_numpy(zero_copy_only=False)
+
+    cleaned = pc.replace_substring(pc.replace_substring(arr, '.', ''), ',', '.')
+    parseable = pc.match_substring_regex(cleaned, _NUMBER_PATTERN)
+    num = pc.cast(pc.if_else(parseable, cleaned, None), pa.float64()).to_numpy(
+        zero_copy_only=False, writable=True
+    )
+
+    fallback = np.isnan(num) & ~empty
+    if fallback.any():
+        num[fallback] = [convert_brazilian_decimal(v) for v in s.to_numpy()[fallback]]
+
+    return pd.Series(num, index=s.index, dtype='float64')
+
+
+def clean_and_transform_data(df: pd.DataFrame, categorize: bool = True) -> pd.DataFrame:
     """
     Limpa e transforma os dados do CSV
 
     Args:
         df: DataFrame bruto
+        categorize: Converte as colunas repetitivas para category (desligado
+            na leitura em blocos, que converte após a concatenação)
 
     Returns:
         DataFrame limpo e transformado
     """
-    # Criar cópia para não modificar original
-    df = df.copy()
+    # Sem cópia defensiva: o chamador deve passar um DataFrame próprio
+    # (recém-lido do CSV), que é modificado diretamente
 
     # Normalizar nomes de colunas: remove espaços extras, padroniza para lowercase e substitui espaços por underscores
     df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
@@ -128,9 +414,12 @@ def clean_and_transform_data(df: pd.DataFrame) -> pd.DataFrame:
     columns_to_drop = [col for col in columns_to_drop if col in df.columns]
     df = df.drop(columns=columns_to_drop, errors='ignore')
 
+    # Conversões de coluna acumuladas e aplicadas juntas em um único assign
+    transforms = {}
+
     # 3. Transformar CPF_CNPJ
     if 'cpf_cnpj' in df.columns:
-        df['cpf_cnpj'] = df['cpf_cnpj'].apply(transform_cpf_cnpj)
+        transforms['cpf_cnpj'] = _vec_cpf_cnpj(df['cpf_cnpj'])
 
     # 4. Converter campos numéricos com formato brasileiro
     numeric_columns = [
@@ -142,21 +431,115 @@ def clean_and_transform_data(df: pd.DataFrame) -> pd.DataFrame:
 
     for col in numeric_columns:
         if col in df.columns:
-            df[col] = df[col].apply(convert_brazilian_decimal)
+            transforms[col] = _vec_br_decimal(df[col])
 
-    # 5. Converter campos inteiros
+    # 5. Converter campos inteiros (menor tipo inteiro que comporta os valores)
+    # Os valores monetários e quantidades continuam float64: float32 não
+    # preserva centavos acima de ~R$ 170 mil (2^24 centavos), e centavos em
+    # int64 mudariam os arredondamentos das somas/médias exibidas nos KPIs
     int_columns = ['duração', 'total_escopos']
     for col in int_columns:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+            values = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+            transforms[col] = pd.to_numeric(values, downcast='integer')
+
+    df = df.assign(**transforms)
 
     # 6. Limpar espaços em strings
     for col in df.select_dtypes(include=['object']).columns:
-        df[col] = df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
+        if pd.api.types.infer_dtype(df[col], skipna=True) in ('string', 'empty'):
+            df[col] = df[col].str.strip()
+        else:
+            # Coluna mista: aplica somente nas células de texto
+            is_str = df[col].map(type).eq(str)
+            df.loc[is_str, col] = df.loc[is_str, col].str.strip()
+
+    # 7. Colunas repetitivas viram category (códigos inteiros + dicionário de valores)
+    if categorize:
+        df = categorize_columns(df)
+        df = convert_text_columns(df)
 
     return df
 
 
+def categorize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte as colunas repetitivas (CATEGORY_COLUMNS) para category
+
+    Só converte quando menos da metade dos valores é distinta.
+
+    Args:
+        df: DataFrame limpo
+
+    Returns:
+        DataFrame com as colunas categóricas convertidas
+    """
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and df[col].nunique(dropna=True) / max(len(df), 1) < 0.5:
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def convert_text_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte as colunas de texto (TEXT_COLUMNS) que seguem como object
+    para strings em Arrow
+
+    Os textos ficam em um buffer contíguo em vez de um objeto Python por
+    célula (menos memória e .str em C); nulos continuam NaN, então
+    astype(str), to_numpy e comparações se comportam como no object.
+    Roda depois de categorize_columns, que tem prioridade (município).
+
+    Args:
+        df: DataFrame limpo
+
+    Returns:
+        DataFrame com as colunas de texto convertidas
+    """
+    if ARROW_TEXT_DTYPE is None:
+        return df
+
+    for col in TEXT_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype(ARROW_TEXT_DTYPE)
+
+    return df
+
+
+def load_clean_concat(file_object, delimiter: str = ';', chunk_rows: int = CSV_CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Carrega e limpa CSVs grandes em blocos de linhas
+
+    Cada bloco é limpo assim que lido e os blocos limpos são concatenados no
+    final, sem manter o CSV bruto inteiro em memória. A conversão para
+    category é feita uma única vez após a concatenação, para que todos os
+    blocos compartilhem as mesmas categorias. A inferência numérica das
+    colunas de valor é feita por bloco.
+
+    Args:
+        file_object: Objeto de arquivo do Streamlit
+        delimiter: Delimitador do CSV (padrão: ';')
+        chunk_rows: Número de linhas por bloco
+
+    Returns:
+        DataFrame limpo e transformado (equivalente a clean_and_transform_data)
+    """
+    reader = pd.read_csv(
+        file_object, delimiter=delimiter, encoding=detect_csv_encoding(file_object),
+        dtype=RAW_TEXT_COLUMNS, chunksize=chunk_rows
+    )
+    chunks = [
+        clean_and_transform_data(chunk.dropna(how='all'), categorize=False)
+        for chunk in reader
+    ]
+
+    # Os índices dos blocos são contínuos, então o índice original é mantido
+    df = pd.concat(chunks, copy=False)
+
+    return convert_text_columns(categorize_columns(df))
+
+
 def calculate_derived_fields(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula campos derivados
@@ -167,36 +550,26 @@ def calculate_derived_fields(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame com campos calculados adicionados
     """
-    df = df.copy()
+    # Sem cópia defensiva: as colunas derivadas são adicionadas no próprio df
 
     # 1. Valor Anual Mapeado = Valor Total Mensal * 12
     if 'valor_total_mensal' in df.columns:
-        df['valor_anual_mapeado'] = df['valor_total_mensal'] * 12
-        # Substitui NaN por 0 para facilitar análises
-        df['valor_anual_mapeado'] = df['valor_anual_mapeado'].fillna(0)
+        # NaN vira 0 já na materialização (facilita análises), em uma única passada
+        df['valor_anual_mapeado'] = df['valor_total_mensal'].to_numpy(dtype='float64', na_value=0.0) * 12.0
     else:
         df['valor_anual_mapeado'] = 0
 
     # 2. Status Mapeamento (case-insensitive e robusto)
     if 'primeiro_escopo' in df.columns:
-        def determine_status(x):
-            # Se é NaN ou None, não está mapeado
-            if pd.isna(x):
-                return 'Não'
-            # Converte para string e remove espaços
-            x_str = str(x).strip()
-            # Se vazio após strip, não está mapeado
-            if x_str == '':
-                return 'Não'
-            # Se é "NÃO" (case-insensitive), não está mapeado
-            if x_str.upper() == 'NÃO':
-                return 'Não'
-            # Caso contrário, está mapeado
-            return 'Sim'
-
-        df['status_mapeamento'] = df['primeiro_escopo'].apply(determine_status)
+        escopo = df['primeiro_escopo'].astype('string[pyarrow]').str.strip()
+        # Mapeado = não nulo, não vazio e diferente de "NÃO" (case-insensitive)
+        mapped = (escopo.notna() & (escopo != '') & (escopo.str.upper() != 'NÃO')).fillna(False)
+        df['status_mapeamento'] = pd.Categorical(
+            np.where(mapped.to_numpy(dtype=bool), 'Sim', 'Não'),
+            categories=STATUS_CATEGORIES
+        )
     else:
-        df['status_mapeamento'] = 'Não'
+        df['status_mapeamento'] = pd.Categorical(['Não'] * len(df), categories=STATUS_CATEGORIES)
 
     return df
 
@@ -248,11 +621,13 @@ def format_currency(value: float) -> str:
     Returns:
         String formatada (ex: "R$ 1.234.567,89")
     """
-    if pd.isna(value):
+    if is_missing(value):
         return "R$ 0,00"
 
     try:
         # Formata com separador de milhares e vírgula decimal
+        # (a troca via str.replace é mais rápida que locale.format_string, que é
+        # implementado em Python, e não depende do locale pt_BR do servidor)
         return f"R$ {value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
     except:
         return "R$ 0,00"
@@ -269,7 +644,7 @@ def format_number(value: float, decimals: int = 0) -> str:
     Returns:
         String formatada (ex: "1.234.567")
     """
-    if pd.isna(value):
+    if is_missing(value):
         return "0"
 
     try:
@@ -282,3 +657,67 @@ def format_number(value: float, decimals: int = 0) -> str:
         return formatted.replace(',', '_').replace('.', ',').replace('_', '.')
     except:
         return "0"
+
+
+def _swap_separators(texts: list) -> np.ndarray:
+    """
+    Troca separadores americanos pelos brasileiros em lote (PyArrow)
+
+    Args:
+        texts: Lista de strings formatadas com ',' de milhar e '.' decimal
+
+    Returns:
+        Array de strings com '.' de milhar e ',' decimal
+    """
+    arr = pc.replace_substring(pa.array(texts, type=pa.string()), ',', '_')
+    arr = pc.replace_substring(pc.replace_substring(arr, '.', ','), '_', '.')
+    return arr.to_numpy(zero_copy_only=False, writable=True)
+
+
+def format_currency_series(s: pd.Series) -> pd.Series:
+    """
+    Versão em lote de format_currency para uma coluna inteira
+
+    Args:
+        s: Série numérica
+
+    Returns:
+        Série de strings (ex: "R$ 1.234.567,89"; nulos viram "R$ 0,00")
+    """
+    if not pd.api.types.is_numeric_dtype(s):
+        return s.map(format_currency)
+
+    values = s.to_numpy(dtype='float64', na_value=np.nan)
+    present = ~np.isnan(values)
+
+    # Só os valores não nulos passam pela formatação
+    result = np.full(len(values), "R$ 0,00", dtype=object)
+    if present.any():
+        result[present] = _swap_separators([f"R$ {v:,.2f}" for v in values[present].tolist()])
+
+    return pd.Series(result, index=s.index, dtype=object)
+
+
+def format_number_series(s: pd.Series, decimals: int = 0) -> pd.Series:
+    """
+    Versão em lote de format_number para uma coluna inteira
+
+    Args:
+        s: Série numérica
+        decimals: Número de casas decimais
+
+    Returns:
+        Série de strings (ex: "1.234.567"; nulos viram "0")
+    """
+    if decimals <= 0 or not pd.api.types.is_numeric_dtype(s):
+        return s.map(lambda x: format_number(x, decimals=decimals))
+
+    values = s.to_numpy(dtype='float64', na_value=np.nan)
+    present = ~np.isnan(values)
+
+    # Só os valores não nulos passam pela formatação
+    result = np.full(len(values), "0", dtype=object)
+    if present.any():
+        result[present] = _swap_separators([f"{v:,.{decimals}f}" for v in values[present].tolist()])
+
+    return pd.Series(result, index=s.index, dtype=object)
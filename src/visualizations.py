@@ -5,10 +5,86 @@ Responsável por renderizar cards, filtros e tabelas
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+from functools import lru_cache
 from typing import Dict, List
-from src.data_processing import format_currency, format_number, format_cpf_cnpj_display
+from src.data_processing import (
+    format_currency,
+    format_number,
+    format_currency_series,
+    format_number_series,
+    format_cpf_cnpj_display,
+    is_missing
+)
+
+
+# Valores de PAI que indicam mina sem grupo (excluídos de rankings e opções)
+PAI_SEM_GRUPO = frozenset({'NA', 'FORA', 'na', 'fora', ''})
+
+# Valores de PAI sempre mantidos pelo filtro de grupo (NA/FORA em qualquer
+# grafia e vazio), além dos grupos selecionados
+PAI_SEMPRE_MANTIDOS = PAI_SEM_GRUPO | {'Na', 'Fora'}
+
+# Colunas do tooltip do Pareto de minas, após a coluna de identificação
+# (customdata[1] em diante no hovertemplate)
+PARETO_HOVER_COLUMNS = (
+    'pai',
+    'município',
+    'uf',
+    'substanciamaiscomercializada',
+    'totalvalorrecolhido',
+    'status_mapeamento',
+    'primeiro_escopo',
+    'valor_total_mensal',
+    'valor_anual_mapeado',
+    'tec'
+)
+
+# Tooltips dos gráficos de Pareto (constantes: não mudam entre reruns)
+PARETO_MINAS_HOVERTEMPLATE = (
+    "<b>%{customdata[0]}</b><br>"
+    "🏢 Grupo: %{customdata[1]}<br>"
+    "📍 Localização: %{customdata[2]} - %{customdata[3]}<br>"
+    "⛏️ Substância: %{customdata[4]}<br>"
+    "💰 CFEM 2024: R$ %{customdata[5]:,.2f}<br>"
+    "📊 Status: %{customdata[6]}<br>"
+    "📋 Escopo: %{customdata[7]}<br>"
+    "💵 Valor Mensal: R$ %{customdata[8]:,.2f}<br>"
+    "💰 Valor Anual: R$ %{customdata[9]:,.2f}<br>"
+    "🎯 TEC: %{customdata[10]}<br>"
+    "<extra></extra>"
+)
+
+PARETO_GRUPOS_HOVERTEMPLATE = (
+    "<b>Grupo: %{customdata[0]}</b><br>"
+    "🏭 Minas: %{customdata[1]} minas<br>"
+    "💰 CFEM: R$ %{customdata[2]:,.2f}<br>"
+    "📊 Representa: %{customdata[3]:.1f}% do CFEM total<br>"
+    "✅ Mapeadas: %{customdata[4]} de %{customdata[1]} (%{customdata[5]:.1f}%)<br>"
+    "💵 Valor Mensal: R$ %{customdata[6]:,.2f}<br>"
+    "💰 Valor Anual: R$ %{customdata[7]:,.2f}<br>"
+    "<extra></extra>"
+)
+
+PARETO_ACUMULADO_HOVERTEMPLATE = "Acumulado: %{y:.1f}%<extra></extra>"
+
+# Acima deste nº de minas no Pareto, a linha de % acumulado usa WebGL
+PARETO_WEBGL_THRESHOLD = 1000
+
+# Acima deste nº de minas no Pareto, o gráfico é exibido sem a barra de
+# ferramentas do Plotly (zoom/pan sobre a cauda densa não agregam)
+PARETO_MODEBAR_THRESHOLD = 300
+
+# Peso de cada TEC no score de prioridade (TEC01 = maior prioridade)
+TEC_WEIGHTS = {
+    'TEC01': 5,
+    'TEC02': 4,
+    'TEC03': 3,
+    'TEC04': 2,
+    'TEC05': 1
+}
 
 
 def format_currency_abbreviated(value: float) -> str:
@@ -21,70 +97,183 @@ def format_currency_abbreviated(value: float) -> str:
     Returns:
         String formatada (ex: "R$ 1.5 Mi", "R$ 2.3 Bi")
     """
-    if pd.isna(value):
+    # Nulos tratados antes do cache (NaN != NaN nunca geraria acerto)
+    if is_missing(value):
         return "R$ 0,00"
 
+    return _format_currency_abbreviated_cached(value)
+
+
+@lru_cache(maxsize=1024, typed=True)
+def _format_currency_abbreviated_cached(value: float) -> str:
+    """
+    Formatação de format_currency_abbreviated, memorizada por valor
+
+    Os mesmos escalares (KPIs, rankings) são formatados a cada rerun
+    enquanto os filtros não mudam.
+    """
     try:
         if value >= 1_000_000_000:
             # Bilhões
-            valor_bi = value / 1_000_000_000
-            return f"R$ {valor_bi:.2f} Bi"
-        elif value >= 1_000_000:
+            return f"R$ {value / 1_000_000_000:.2f} Bi"
+        if value >= 1_000_000:
             # Milhões
-            valor_mi = value / 1_000_000
-            return f"R$ {valor_mi:.2f} Mi"
-        else:
-            # Valores menores que 1 milhão - formato completo
-            return f"R$ {value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
-    except:
+            return f"R$ {value / 1_000_000:.2f} Mi"
+
+        # Valores menores que 1 milhão - formato completo
+        return f"R$ {value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+    except (TypeError, ValueError):
+        # Valor não numérico (ex.: texto): mesmo retorno dos nulos
         return "R$ 0,00"
 
 
-def render_kpi_section(df: pd.DataFrame, filters_applied: bool = False) -> None:
+def mask_com_grupo(df: pd.DataFrame) -> np.ndarray:
     """
-    Renderiza seção de KPIs com 4 cards principais
+    Máscara das minas com grupo (PAI preenchido e fora de PAI_SEM_GRUPO)
+
+    Em colunas category o teste é feito uma vez por categoria e
+    distribuído pelos códigos, numa única passada sobre a coluna.
 
     Args:
-        df: DataFrame filtrado
-        filters_applied: Se há filtros ativos (para mostrar aviso)
+        df: DataFrame com a coluna pai
+
+    Returns:
+        Array booleano, uma posição por linha
     """
-    st.header("📊 Visão Geral")
+    pai = df['pai']
+    if isinstance(pai.dtype, pd.CategoricalDtype):
+        # Último elemento = flag dos nulos (código -1), sempre sem grupo
+        flags = np.append(~pai.cat.categories.isin(PAI_SEM_GRUPO), False)
+        return flags[pai.cat.codes.to_numpy()]
 
-    if filters_applied:
-        st.markdown("""
-        <div style="background-color: #FFF3E0; border-left: 4px solid #FF6B35; padding: 12px; border-radius: 4px; margin-bottom: 1rem;">
-            <p style="margin: 0; color: #2D3142; font-size: 0.95em;">
-                🔍 Filtros aplicados - KPIs refletem apenas os dados filtrados
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+    return (~pai.isin(PAI_SEM_GRUPO) & pai.notna()).to_numpy()
 
-    # === CARD 1: Panorama do Mercado ===
-    st.subheader("🌍 Panorama do Mercado")
-    col1, col2, col3 = st.columns(3)
 
+def count_distinct(series: pd.Series) -> int:
+    """
+    Nº de valores distintos não nulos (equivale a series.nunique())
+
+    Em colunas category conta direto sobre os códigos inteiros, sem
+    passar pela tabela de hash do nunique.
+
+    Args:
+        series: Série a contar
+
+    Returns:
+        Quantidade de valores distintos, ignorando nulos
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Código -1 (nulo) cai na posição 0 do bincount e é descartado
+        codes = series.cat.codes.to_numpy()
+        return int(np.count_nonzero(np.bincount(codes + 1, minlength=1)[1:]))
+    return series.nunique()
+
+
+def count_values(series: pd.Series, values: List) -> List[int]:
+    """
+    Contagem de cada valor em values, na ordem dada (0 se ausente)
+
+    Equivale a series.value_counts().reindex(values, fill_value=0). Em
+    colunas category é um único np.bincount sobre os códigos inteiros.
+
+    Args:
+        series: Série a contar
+        values: Valores cuja contagem é devolvida
+
+    Returns:
+        Lista de contagens, alinhada com values
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        # Código -1 (nulo) cai na posição 0 do bincount; valores fora das
+        # categorias (get_indexer = -1) também, e por isso ela é zerada
+        counts = np.bincount(series.cat.codes.to_numpy() + 1, minlength=len(categories) + 1)
+        counts[0] = 0
+        return counts[categories.get_indexer(pd.Index(values, dtype=object)) + 1].tolist()
+    return series.value_counts().reindex(values, fill_value=0).tolist()
+
+
+def _top_n_cfem(keys: pd.Series, values: np.ndarray, mask: np.ndarray, n: int = 5) -> pd.Series:
+    """
+    TOP N de CFEM somado por grupo, em ordem crescente (maior no topo do gráfico)
+
+    Os rankings da Visão Geral compartilham o mesmo array de valores, lido
+    uma vez. Em chaves category a soma por grupo é um np.bincount sobre os
+    códigos inteiros (sem hashing); nas demais usa o groupby do pandas.
+
+    Args:
+        keys: Coluna de agrupamento
+        values: CFEM por linha (float64, nulos como 0)
+        mask: Máscara booleana das linhas consideradas
+        n: Quantidade de grupos
+
+    Returns:
+        Série com o CFEM total dos N maiores grupos
+    """
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        categories = keys.cat.categories
+        codes = keys.cat.codes.to_numpy()
+        selected = mask & (codes >= 0)
+
+        sums = np.bincount(codes[selected], weights=values[selected], minlength=len(categories))
+        observed = np.bincount(codes[selected], minlength=len(categories)) > 0
+
+        grouped = pd.Series(
+            sums[observed],
+            index=pd.CategoricalIndex(categories[observed], categories=categories, name=keys.name),
+            name='totalvalorrecolhido'
+        )
+    else:
+        grouped = (
+            pd.Series(values[mask], index=keys.index[mask], name='totalvalorrecolhido')
+            .groupby(keys[mask], observed=True)
+            .sum()
+        )
+
+    return (
+        grouped
+        .sort_values(ascending=False)
+        .head(n)
+        .iloc[::-1]  # Inverte ordem para exibição (maior no topo)
+    )
+
+
+def calculate_kpis(df: pd.DataFrame) -> Dict:
+    """
+    Calcula os KPIs da Visão Geral (somente pandas, sem renderização)
+
+    Args:
+        df: DataFrame filtrado
+
+    Returns:
+        Dicionário com os escalares dos cards e as séries TOP 5
+    """
+    kpis = {}
+
+    # === CARD 1: Panorama do Mercado ===
     # Total de Minas
     total_minas = len(df) if 'chaveprimaria' not in df.columns else df['chaveprimaria'].nunique()
 
     # CFEM Total Coletado 2024
     cfem_total = df['totalvalorrecolhido'].sum() if 'totalvalorrecolhido' in df.columns else 0
-    cfem_bilhoes = cfem_total / 1_000_000_000
 
     # Ticket Médio CFEM
     ticket_medio = cfem_total / total_minas if total_minas > 0 else 0
-    ticket_medio_milhoes = ticket_medio / 1_000_000
 
-    col1.metric("Total de Minas", f"{total_minas:,}".replace(',', '.'))
-    col2.metric("CFEM Total 2024", f"R$ {cfem_bilhoes:.2f} Bi")
-    col3.metric("Ticket Médio CFEM", f"R$ {ticket_medio_milhoes:.2f} Mi")
+    kpis['total_minas'] = total_minas
+    kpis['cfem_total'] = cfem_total
+    kpis['ticket_medio'] = ticket_medio
 
     # === CARD 2: Estrutura de Mercado ===
-    st.subheader("🏢 Estrutura de Mercado")
+    kpis['top5_grupos'] = None
+    kpis['top5_substancias'] = None
+    kpis['top5_estados'] = None
 
     # Total de Grupos (excluindo NA e FORA)
     if 'pai' in df.columns:
         # Filtra minas com grupo (exclui NA, FORA e vazios)
-        df_com_grupo = df[~df['pai'].isin(['NA', 'FORA', 'na', 'fora', '']) & df['pai'].notna()]
+        mask_grupo = mask_com_grupo(df)
+        df_com_grupo = df[mask_grupo]
         grupos = df_com_grupo['pai'].dropna()
         total_grupos = grupos.nunique()
 
@@ -92,142 +281,42 @@ def render_kpi_section(df: pd.DataFrame, filters_applied: bool = False) -> None:
         cfem_grupos = df_com_grupo['totalvalorrecolhido'].sum() if 'totalvalorrecolhido' in df.columns else 0
 
         # Ticket Médio por Grupo
-        ticket_medio_grupo = cfem_grupos / total_grupos if total_grupos > 0 else 0
-        ticket_medio_grupo_milhoes = ticket_medio_grupo / 1_000_000
+        kpis['total_grupos'] = total_grupos
+        kpis['ticket_medio_grupo'] = cfem_grupos / total_grupos if total_grupos > 0 else 0
 
         # TOP 5 Grupos por CFEM
         if 'totalvalorrecolhido' in df.columns:
-            top5_grupos = (
-                df_com_grupo
-                .groupby('pai')['totalvalorrecolhido']
-                .sum()
-                .sort_values(ascending=False)
-                .head(5)
-                .iloc[::-1]  # Inverte ordem para exibição (maior no topo)
-            )
+            # (os três rankings reaproveitam o mesmo array de CFEM)
+            cfem = df['totalvalorrecolhido'].to_numpy(dtype='float64', na_value=0.0)
+            kpis['top5_grupos'] = _top_n_cfem(df['pai'], cfem, mask_grupo)
 
             # TOP 5 Substâncias por CFEM
-            top5_substancias = (
-                df[df['substanciamaiscomercializada'].notna() &
-                   (df['substanciamaiscomercializada'] != '')]
-                .groupby('substanciamaiscomercializada')['totalvalorrecolhido']
-                .sum()
-                .sort_values(ascending=False)
-                .head(5)
-                .iloc[::-1]  # Inverte ordem para exibição (maior no topo)
+            substancia = df['substanciamaiscomercializada']
+            kpis['top5_substancias'] = _top_n_cfem(
+                substancia, cfem, (substancia.notna() & (substancia != '')).to_numpy()
             )
 
             # TOP 5 Estados por CFEM
-            top5_estados = (
-                df[df['uf'].notna() & (df['uf'] != '')]
-                .groupby('uf')['totalvalorrecolhido']
-                .sum()
-                .sort_values(ascending=False)
-                .head(5)
-                .iloc[::-1]  # Inverte ordem para exibição (maior no topo)
-            )
-
-            # Cards com métricas
-            col_card1, col_card2 = st.columns(2)
-
-            with col_card1:
-                st.metric("Total de Grupos", total_grupos)
-                st.caption("(Excluindo NA e FORA)")
-
-            with col_card2:
-                st.metric("Ticket Médio por Grupo", f"R$ {ticket_medio_grupo_milhoes:.2f} Mi")
-
-            # 3 Gráficos lado a lado
-            col1, col2, col3 = st.columns(3)
-
-            # GRÁFICO 1: TOP 5 Grupos
-            with col1:
-                fig_grupos = go.Figure(go.Bar(
-                    x=top5_grupos.values,
-                    y=top5_grupos.index,
-                    orientation='h',
-                    marker=dict(color='#95A3B3'),
-                    text=[format_currency_abbreviated(v) for v in top5_grupos.values],
-                    textposition='auto',
-                    hovertemplate='<b>%{y}</b><br>CFEM: %{text}<extra></extra>'
-                ))
-
-                fig_grupos.update_layout(
-                    title="TOP 5 Grupos por CFEM",
-                    xaxis_title="",
-                    yaxis_title="",
-                    height=240,
-                    margin=dict(l=10, r=10, t=40, b=10),
-                    showlegend=False
-                )
-
-                st.plotly_chart(fig_grupos, use_container_width=True)
-
-            # GRÁFICO 2: TOP 5 Substâncias
-            with col2:
-                fig_substancias = go.Figure(go.Bar(
-                    x=top5_substancias.values,
-                    y=top5_substancias.index,
-                    orientation='h',
-                    marker=dict(color='#95A3B3'),
-                    text=[format_currency_abbreviated(v) for v in top5_substancias.values],
-                    textposition='auto',
-                    hovertemplate='<b>%{y}</b><br>CFEM: %{text}<extra></extra>'
-                ))
-
-                fig_substancias.update_layout(
-                    title="TOP 5 Substâncias por CFEM",
-                    xaxis_title="",
-                    yaxis_title="",
-                    height=240,
-                    margin=dict(l=10, r=10, t=40, b=10),
-                    showlegend=False
-                )
-
-                st.plotly_chart(fig_substancias, use_container_width=True)
-
-            # GRÁFICO 3: TOP 5 Estados
-            with col3:
-                fig_estados = go.Figure(go.Bar(
-                    x=top5_estados.values,
-                    y=top5_estados.index,
-                    orientation='h',
-                    marker=dict(color='#95A3B3'),
-                    text=[format_currency_abbreviated(v) for v in top5_estados.values],
-                    textposition='auto',
-                    hovertemplate='<b>%{y}</b><br>CFEM: %{text}<extra></extra>'
-                ))
-
-                fig_estados.update_layout(
-                    title="TOP 5 Estados por CFEM",
-                    xaxis_title="",
-                    yaxis_title="",
-                    height=240,
-                    margin=dict(l=10, r=10, t=40, b=10),
-                    showlegend=False
-                )
-
-                st.plotly_chart(fig_estados, use_container_width=True)
-        else:
-            st.metric("Total de Grupos", total_grupos)
-            st.metric("Ticket Médio por Grupo", "R$ 0,00")
-    else:
-        st.warning("Coluna 'pai' não encontrada nos dados")
-
-    st.markdown("---")
+            kpis['top5_estados'] = _top_n_cfem(df['uf'], cfem, (df['uf'].notna() & (df['uf'] != '')).to_numpy())
 
     # === CARD 3: Mapeamento Comercial ===
-    st.subheader("🎯 Mapeamento Comercial")
-
     # Calcula quantas minas têm grupo (excluindo NA/FORA)
+    # (reusa a máscara do card 2: contagem direta, sem materializar o recorte)
     if 'pai' in df.columns:
-        minas_com_grupo = len(df[~df['pai'].isin(['NA', 'FORA', 'na', 'fora', '']) & df['pai'].notna()])
+        minas_com_grupo = int(mask_grupo.sum())
     else:
         minas_com_grupo = total_minas
 
-    # Minas Mapeadas
+    # Subconjunto das minas mapeadas (materializado uma única vez e
+    # reaproveitado pelos valores mapeados e pelos cards da linha 2)
     if 'status_mapeamento' in df.columns:
-        minas_mapeadas = len(df[df['status_mapeamento'] == 'Sim'])
+        df_status_sim = df[df['status_mapeamento'] == 'Sim']
+    else:
+        df_status_sim = None
+
+    # Minas Mapeadas
+    if df_status_sim is not None:
+        minas_mapeadas = len(df_status_sim)
         perc_mapeadas_total = (minas_mapeadas / total_minas * 100) if total_minas > 0 else 0
         perc_mapeadas_com_grupo = (minas_mapeadas / minas_com_grupo * 100) if minas_com_grupo > 0 else 0
     else:
@@ -236,22 +325,28 @@ def render_kpi_section(df: pd.DataFrame, filters_applied: bool = False) -> None:
         perc_mapeadas_com_grupo = 0
 
     # Valor Mensal Mapeado
-    if 'valor_total_mensal' in df.columns and 'status_mapeamento' in df.columns:
-        valor_mensal = df[df['status_mapeamento'] == 'Sim']['valor_total_mensal'].sum()
+    if 'valor_total_mensal' in df.columns and df_status_sim is not None:
+        valor_mensal = df_status_sim['valor_total_mensal'].sum()
     else:
         valor_mensal = 0
 
     # Valor Anual Mapeado
-    if 'valor_anual_mapeado' in df.columns and 'status_mapeamento' in df.columns:
-        valor_anual = df[df['status_mapeamento'] == 'Sim']['valor_anual_mapeado'].sum()
+    if 'valor_anual_mapeado' in df.columns and df_status_sim is not None:
+        valor_anual = df_status_sim['valor_anual_mapeado'].sum()
     else:
         valor_anual = valor_mensal * 12
 
+    kpis['minas_mapeadas'] = minas_mapeadas
+    kpis['perc_mapeadas_total'] = perc_mapeadas_total
+    kpis['perc_mapeadas_com_grupo'] = perc_mapeadas_com_grupo
+    kpis['valor_mensal'] = valor_mensal
+    kpis['valor_anual'] = valor_anual
+
     # === CÁLCULOS PARA NOVOS CARDS (LINHA 2) ===
 
     # Cálculo: Índice Valor/CFEM (movido da seção Efetividade)
-    if 'status_mapeamento' in df.columns and 'totalvalorrecolhido' in df.columns:
-        df_mapeadas = df[df['status_mapeamento'] == 'Sim']
+    if df_status_sim is not None and 'totalvalorrecolhido' in df.columns:
+        df_mapeadas = df_status_sim
         cfem_mapeadas = df_mapeadas['totalvalorrecolhido'].sum()
         indice_valor_cfem = (valor_anual / cfem_mapeadas * 100) if cfem_mapeadas > 0 else 0
     else:
@@ -265,17 +360,187 @@ def render_kpi_section(df: pd.DataFrame, filters_applied: bool = False) -> None:
             qtd_empresas = df_mapeadas[df_mapeadas['tec'] == tec]['pai'].nunique()
             if qtd_empresas > 0:
                 empresas_por_tec[tec] = qtd_empresas
-    texto_empresas_tec = " | ".join([f"{tec}: {qtd}" for tec, qtd in empresas_por_tec.items()])
 
     # Cálculo: Ticket Médio
     if len(df_mapeadas) > 0:
         ticket_medio_cfem = df_mapeadas['totalvalorrecolhido'].mean()
         ticket_medio_valor_anual = df_mapeadas['valor_anual_mapeado'].mean() if 'valor_anual_mapeado' in df_mapeadas.columns else 0
-        qtd_mapeadas = len(df_mapeadas)
     else:
         ticket_medio_cfem = 0
         ticket_medio_valor_anual = 0
-        qtd_mapeadas = 0
+
+    kpis['indice_valor_cfem'] = indice_valor_cfem
+    kpis['empresas_por_tec'] = empresas_por_tec
+    kpis['ticket_medio_cfem'] = ticket_medio_cfem
+    kpis['ticket_medio_valor_anual'] = ticket_medio_valor_anual
+
+    return kpis
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_kpis(cache_key: tuple, _df: pd.DataFrame) -> Dict:
+    """
+    KPIs em cache por versão do dataset + filtros
+
+    Args:
+        cache_key: Chave estável do recorte (hash do arquivo, filtros)
+        _df: DataFrame filtrado (não entra no hash)
+
+    Returns:
+        Dicionário de calculate_kpis
+    """
+    return calculate_kpis(_df)
+
+
+def clear_visualization_caches() -> None:
+    """
+    Limpa os caches deste módulo (chamado ao descartar os dados carregados)
+    """
+    _cached_kpis.clear()
+    _cached_pareto_80.clear()
+    _cached_csv_simulacao.clear()
+
+
+# Layout comum aos três gráficos TOP 5 do card de Estrutura de Mercado
+_TOP5_LAYOUT = dict(
+    xaxis_title="",
+    yaxis_title="",
+    height=240,
+    margin=dict(l=10, r=10, t=40, b=10),
+    showlegend=False
+)
+
+
+def _bar_top5(title: str, top5: pd.Series) -> go.Figure:
+    """
+    Monta o gráfico de barras horizontais de um ranking TOP 5 por CFEM
+
+    Args:
+        title: Título do gráfico
+        top5: Série já ordenada (índice = categoria, valores = CFEM)
+
+    Returns:
+        Figura Plotly pronta para st.plotly_chart
+    """
+    values = top5.to_numpy()
+    return go.Figure(
+        go.Bar(
+            x=values,
+            y=top5.index,
+            orientation='h',
+            marker=dict(color='#95A3B3'),
+            text=[format_currency_abbreviated(v) for v in values],
+            textposition='auto',
+            hovertemplate='<b>%{y}</b><br>CFEM: %{text}<extra></extra>'
+        ),
+        layout=dict(_TOP5_LAYOUT, title=title)
+    )
+
+
+def _card_note(html: str) -> None:
+    """
+    Texto explicativo abaixo de um card (um único elemento markdown)
+
+    Args:
+        html: Conteúdo do parágrafo (aceita <br>)
+    """
+    st.markdown(
+        f'<p style="color: #2D3142; font-size: 0.95rem; margin: 0;">{html}</p>',
+        unsafe_allow_html=True
+    )
+
+
+def render_kpi_section(df: pd.DataFrame, filters_applied: bool = False, cache_key: tuple = None) -> None:
+    """
+    Renderiza seção de KPIs com 4 cards principais
+
+    Args:
+        df: DataFrame filtrado
+        filters_applied: Se há filtros ativos (para mostrar aviso)
+        cache_key: Chave estável do recorte; se informada, os KPIs vêm do
+            cache em vez de serem recalculados a cada rerun
+    """
+    kpis = _cached_kpis(cache_key, df) if cache_key is not None else calculate_kpis(df)
+
+    st.header("📊 Visão Geral")
+
+    if filters_applied:
+        st.markdown("""
+        <div style="background-color: #FFF3E0; border-left: 4px solid #FF6B35; padding: 12px; border-radius: 4px; margin-bottom: 1rem;">
+            <p style="margin: 0; color: #2D3142; font-size: 0.95em;">
+                🔍 Filtros aplicados - KPIs refletem apenas os dados filtrados
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # === CARD 1: Panorama do Mercado ===
+    st.subheader("🌍 Panorama do Mercado")
+    col1, col2, col3 = st.columns(3)
+
+    total_minas = kpis['total_minas']
+    cfem_bilhoes = kpis['cfem_total'] / 1_000_000_000
+    ticket_medio_milhoes = kpis['ticket_medio'] / 1_000_000
+
+    col1.metric("Total de Minas", f"{total_minas:,}".replace(',', '.'))
+    col2.metric("CFEM Total 2024", f"R$ {cfem_bilhoes:.2f} Bi")
+    col3.metric("Ticket Médio CFEM", f"R$ {ticket_medio_milhoes:.2f} Mi")
+
+    # === CARD 2: Estrutura de Mercado ===
+    st.subheader("🏢 Estrutura de Mercado")
+
+    if 'pai' in df.columns:
+        total_grupos = kpis['total_grupos']
+        ticket_medio_grupo_milhoes = kpis['ticket_medio_grupo'] / 1_000_000
+
+        if kpis['top5_grupos'] is not None:
+            top5_grupos = kpis['top5_grupos']
+            top5_substancias = kpis['top5_substancias']
+            top5_estados = kpis['top5_estados']
+
+            # Cards com métricas
+            col_card1, col_card2 = st.columns(2)
+
+            with col_card1:
+                st.metric("Total de Grupos", total_grupos)
+                st.caption("(Excluindo NA e FORA)")
+
+            with col_card2:
+                st.metric("Ticket Médio por Grupo", f"R$ {ticket_medio_grupo_milhoes:.2f} Mi")
+
+            # 3 Gráficos lado a lado
+            col1, col2, col3 = st.columns(3)
+
+            # GRÁFICO 1: TOP 5 Grupos
+            with col1:
+                st.plotly_chart(_bar_top5("TOP 5 Grupos por CFEM", top5_grupos), use_container_width=True)
+
+            # GRÁFICO 2: TOP 5 Substâncias
+            with col2:
+                st.plotly_chart(_bar_top5("TOP 5 Substâncias por CFEM", top5_substancias), use_container_width=True)
+
+            # GRÁFICO 3: TOP 5 Estados
+            with col3:
+                st.plotly_chart(_bar_top5("TOP 5 Estados por CFEM", top5_estados), use_container_width=True)
+        else:
+            st.metric("Total de Grupos", total_grupos)
+            st.metric("Ticket Médio por Grupo", "R$ 0,00")
+    else:
+        st.warning("Coluna 'pai' não encontrada nos dados")
+
+    st.markdown("---")
+
+    # === CARD 3: Mapeamento Comercial ===
+    st.subheader("🎯 Mapeamento Comercial")
+
+    minas_mapeadas = kpis['minas_mapeadas']
+    perc_mapeadas_total = kpis['perc_mapeadas_total']
+    perc_mapeadas_com_grupo = kpis['perc_mapeadas_com_grupo']
+    valor_mensal = kpis['valor_mensal']
+    valor_anual = kpis['valor_anual']
+    indice_valor_cfem = kpis['indice_valor_cfem']
+    ticket_medio_cfem = kpis['ticket_medio_cfem']
+    ticket_medio_valor_anual = kpis['ticket_medio_valor_anual']
+    texto_empresas_tec = " | ".join([f"{tec}: {qtd}" for tec, qtd in kpis['empresas_por_tec'].items()])
 
     # Layout em 3 colunas (LINHA 1)
     col1, col2, col3 = st.columns(3)
@@ -309,10 +574,7 @@ def render_kpi_section(df: pd.DataFrame, filters_applied: bool = False) -> None:
             f"{indice_valor_cfem:.2f}%",
             help="(Valor Anual Mapeado / CFEM das minas mapeadas) × 100"
         )
-        st.markdown(
-            f'<p style="color: #2D3142; font-size: 0.95rem; margin: 0;">Eficiência do mapeamento comercial</p>',
-            unsafe_allow_html=True
-        )
+        _card_note("Eficiência do mapeamento comercial")
 
     # Card 5: Empresas por TEC (NOVO)
     with col5:
@@ -321,10 +583,7 @@ def render_kpi_section(df: pd.DataFrame, filters_applied: bool = False) -> None:
             texto_empresas_tec if texto_empresas_tec else "Nenhuma",
             help="Quantidade de empresas/grupos únicos mapeados por nível de prioridade comercial (TEC)"
         )
-        st.markdown(
-            f'<p style="color: #2D3142; font-size: 0.95rem; margin: 0;">Quantidade de empresas mapeadas por estratégia</p>',
-            unsafe_allow_html=True
-        )
+        _card_note("Quantidade de empresas mapeadas por estratégia")
 
     # Card 6: Ticket Médio (NOVO)
     with col6:
@@ -333,25 +592,106 @@ def render_kpi_section(df: pd.DataFrame, filters_applied: bool = False) -> None:
             format_currency_abbreviated(ticket_medio_cfem),
             help="Ticket médio de CFEM e Valor Anual das minas mapeadas. Indica o perfil das minas na carteira."
         )
-        st.markdown(
-            f'<p style="color: #2D3142; font-size: 0.95rem; margin: 0;">'
+        _card_note(
             f'CFEM médio: {format_currency_abbreviated(ticket_medio_cfem)} por mina<br>'
             f'Valor Anual médio: {format_currency_abbreviated(ticket_medio_valor_anual)} por mina'
-            f'</p>',
-            unsafe_allow_html=True
         )
 
 
-def build_filter_sidebar(df: pd.DataFrame) -> Dict:
+def _sorted_options(series: pd.Series, exclude: List = None) -> List:
+    """
+    Opções ordenadas (sem nulos) de uma coluna para os filtros
+
+    Em colunas category usa o dicionário de categorias, que já é único e
+    ordenado, sem varrer a coluna; nas demais ordena os valores únicos.
+
+    Args:
+        series: Coluna do DataFrame completo
+        exclude: Valores a remover das opções
+
+    Returns:
+        Lista ordenada de valores distintos
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        options = list(series.cat.categories)
+    else:
+        options = sorted(series.dropna().unique())
+
+    if exclude:
+        options = [v for v in options if v not in exclude]
+
+    return options
+
+
+def calculate_filter_options(df: pd.DataFrame) -> Dict:
+    """
+    Listas de opções, limites da faixa CFEM e quartis de porte dos filtros
+    da Visão Geral e da Simulação
+
+    Args:
+        df: DataFrame completo
+
+    Returns:
+        Dicionário com as opções de cada filtro (apenas colunas existentes)
+    """
+    options = {}
+
+    if 'uf' in df.columns:
+        options['uf'] = _sorted_options(df['uf'])
+    if 'tec' in df.columns:
+        options['tec'] = _sorted_options(df['tec'])
+    if 'pai' in df.columns:
+        options['pai'] = _sorted_options(df['pai'], exclude=PAI_SEM_GRUPO)
+    if 'terceiriza_lavra?' in df.columns:
+        options['terceiriza'] = _sorted_options(df['terceiriza_lavra?'])
+    if 'substanciamaiscomercializada' in df.columns:
+        options['substancia'] = _sorted_options(df['substanciamaiscomercializada'])
+    if 'totalvalorrecolhido' in df.columns:
+        options['cfem_min'] = float(df['totalvalorrecolhido'].min())
+        options['cfem_max'] = float(df['totalvalorrecolhido'].max())
+
+        # Quartis do porte da mina (apenas valores > 0): um único quantile
+        # com os três níveis faz uma só seleção parcial sobre o array
+        cfem = df['totalvalorrecolhido'].to_numpy()
+        valores_positivos = cfem[cfem > 0]
+        if len(valores_positivos) > 0:
+            options['cfem_quartis'] = tuple(np.quantile(valores_positivos, [0.25, 0.50, 0.75]))
+        else:
+            options['cfem_quartis'] = None
+
+    return options
+
+
+def _select_all_filters(options: Dict, key_prefix: str = 'filter_') -> None:
+    """
+    Callback dos botões "Selecionar Todos" / "Todos": preenche os multiselects
+
+    Args:
+        options: Opções dos filtros (as mesmas listas usadas nos widgets)
+        key_prefix: Prefixo das keys dos widgets ('filter_' na Visão Geral,
+            'sim_filter_' na Simulação)
+    """
+    for option_key in ['uf', 'tec', 'pai', 'terceiriza', 'substancia']:
+        if option_key in options:
+            # list() evita compartilhar a lista das opções com o session state
+            st.session_state[key_prefix + option_key] = list(options[option_key])
+
+
+def build_filter_sidebar(df: pd.DataFrame, options: Dict = None) -> Dict:
     """
     Constrói filtros interativos na sidebar
 
     Args:
         df: DataFrame completo
+        options: Opções pré-calculadas (calculate_filter_options, guardadas
+            no session state a cada carga); se None, são recalculadas
 
     Returns:
         Dicionário com valores selecionados
     """
+    if options is None:
+        options = calculate_filter_options(df)
+
     st.sidebar.markdown("---")
     st.sidebar.header("🔍 Filtros")
 
@@ -361,7 +701,7 @@ def build_filter_sidebar(df: pd.DataFrame) -> Dict:
     with st.sidebar.expander("📍 Filtros Geográficos", expanded=True):
         # Filtro: UF
         if 'uf' in df.columns:
-            ufs = sorted(df['uf'].dropna().unique())
+            ufs = options['uf']
             filters['uf'] = st.multiselect(
                 "Estado (UF)",
                 options=ufs,
@@ -375,7 +715,7 @@ def build_filter_sidebar(df: pd.DataFrame) -> Dict:
     with st.sidebar.expander("🏢 Filtros de Negócio", expanded=True):
         # Filtro: TEC
         if 'tec' in df.columns:
-            tec_options = sorted(df['tec'].dropna().unique())
+            tec_options = options['tec']
             filters['tec'] = st.multiselect(
                 "TEC (Estratégia)",
                 options=tec_options,
@@ -388,9 +728,7 @@ def build_filter_sidebar(df: pd.DataFrame) -> Dict:
 
         # Filtro: Grupo/PAI (excluindo NA e FORA)
         if 'pai' in df.columns:
-            grupos = sorted(
-                df[~df['pai'].isin(['NA', 'FORA', 'na', 'fora', ''])]['pai'].dropna().unique()
-            )
+            grupos = options['pai']
             filters['pai'] = st.multiselect(
                 "Grupo/Holding",
                 options=grupos,
@@ -403,7 +741,7 @@ def build_filter_sidebar(df: pd.DataFrame) -> Dict:
 
         # Filtro: Terceiriza Lavra
         if 'terceiriza_lavra?' in df.columns:
-            terceiriza_options = sorted(df['terceiriza_lavra?'].dropna().unique())
+            terceiriza_options = options['terceiriza']
             filters['Terceiriza'] = st.multiselect(
                 "Terceiriza Lavra?",
                 options=terceiriza_options,
@@ -417,7 +755,7 @@ def build_filter_sidebar(df: pd.DataFrame) -> Dict:
     with st.sidebar.expander("⛏️ Filtros Técnicos", expanded=True):
         # Filtro: Substância
         if 'substanciamaiscomercializada' in df.columns:
-            substancias = sorted(df['substanciamaiscomercializada'].dropna().unique())
+            substancias = options['substancia']
             filters['substancia'] = st.multiselect(
                 "Substância Mineral",
                 options=substancias,
@@ -446,8 +784,8 @@ def build_filter_sidebar(df: pd.DataFrame) -> Dict:
 
         # Filtro: Faixa CFEM
         if 'totalvalorrecolhido' in df.columns:
-            cfem_min = float(df['totalvalorrecolhido'].min())
-            cfem_max = float(df['totalvalorrecolhido'].max())
+            cfem_min = options['cfem_min']
+            cfem_max = options['cfem_max']
 
             if cfem_min < cfem_max:
                 filters['CFEM_range'] = st.slider(
@@ -467,21 +805,14 @@ def build_filter_sidebar(df: pd.DataFrame) -> Dict:
     st.sidebar.markdown("---")
 
     # Botão para selecionar todos os filtros
-    if st.sidebar.button("✅ Selecionar Todos nos Filtros", use_container_width=True):
-        # Preenche todos os filtros multiselect com todas as opções
-        if 'uf' in df.columns:
-            st.session_state.filter_uf = sorted(df['uf'].dropna().unique())
-        if 'tec' in df.columns:
-            st.session_state.filter_tec = sorted(df['tec'].dropna().unique())
-        if 'pai' in df.columns:
-            st.session_state.filter_pai = sorted(
-                df[~df['pai'].isin(['NA', 'FORA', 'na', 'fora', ''])]['pai'].dropna().unique()
-            )
-        if 'terceiriza_lavra?' in df.columns:
-            st.session_state.filter_terceiriza = sorted(df['terceiriza_lavra?'].dropna().unique())
-        if 'substanciamaiscomercializada' in df.columns:
-            st.session_state.filter_substancia = sorted(df['substanciamaiscomercializada'].dropna().unique())
-        st.rerun()
+    # (callback: roda antes dos widgets do próximo rerun, quando as keys
+    # dos multiselects ainda podem ser alteradas)
+    st.sidebar.button(
+        "✅ Selecionar Todos nos Filtros",
+        use_container_width=True,
+        on_click=_select_all_filters,
+        args=(options,)
+    )
 
     # Botão para resetar filtros
     if st.sidebar.button("🔄 Resetar Filtros", use_container_width=True):
@@ -505,10 +836,37 @@ def build_filter_sidebar(df: pd.DataFrame) -> Dict:
     return filters
 
 
+def _isin_mask(series: pd.Series, values: List) -> np.ndarray:
+    """
+    Máscara booleana equivalente a series.isin(values)
+
+    Em colunas category compara os códigos inteiros (np.isin) em vez das
+    strings; nas demais usa o isin do pandas.
+
+    Args:
+        series: Coluna a testar
+        values: Valores aceitos
+
+    Returns:
+        Array booleano com o tamanho da série
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.categories.get_indexer(pd.Index(values, dtype=object))
+        # -1 = valor fora das categorias (não pode casar com os nulos, também -1)
+        return np.isin(series.cat.codes.to_numpy(), codes[codes >= 0])
+
+    return series.isin(values).to_numpy()
+
+
 def apply_filters(df: pd.DataFrame, filters: Dict) -> pd.DataFrame:
     """
     Aplica filtros ao DataFrame
 
+    Todos os filtros são combinados em uma única máscara booleana e o
+    DataFrame é indexado uma só vez no final. Se nenhum registro for
+    removido, o próprio DataFrame é devolvido (sem cópia); o resultado deve
+    ser tratado como somente leitura.
+
     Args:
         df: DataFrame completo
         filters: Dicionário com valores dos filtros
@@ -516,48 +874,51 @@ def apply_filters(df: pd.DataFrame, filters: Dict) -> pd.DataFrame:
     Returns:
         DataFrame filtrado
     """
-    result = df.copy()
+    mask = np.ones(len(df), dtype=bool)
 
     # Filtro TEC
     if filters.get('tec') and len(filters['tec']) > 0:
-        result = result[result['tec'].isin(filters['tec'])]
+        mask &= _isin_mask(df['tec'], filters['tec'])
 
     # Filtro Status Mapeamento
     if filters.get('status_mapeamento') and len(filters['status_mapeamento']) > 0:
-        result = result[result['status_mapeamento'].isin(filters['status_mapeamento'])]
+        mask &= _isin_mask(df['status_mapeamento'], filters['status_mapeamento'])
 
     # Filtro Substância
     if filters.get('substancia') and len(filters['substancia']) > 0:
-        result = result[result['substanciamaiscomercializada'].isin(filters['substancia'])]
+        mask &= _isin_mask(df['substanciamaiscomercializada'], filters['substancia'])
 
     # Filtro UF
     if filters.get('uf') and len(filters['uf']) > 0:
-        result = result[result['uf'].isin(filters['uf'])]
+        mask &= _isin_mask(df['uf'], filters['uf'])
 
     # Filtro PAI (sempre mantém NA/FORA independente do filtro)
     if filters.get('pai') and len(filters['pai']) > 0:
-        # Inclui os grupos selecionados + variações de NA/FORA (case-insensitive)
-        grupos_permitidos = filters['pai'] + ['NA', 'FORA', 'na', 'fora', 'Na', 'Fora']
-        # Também mantém registros com PAI vazio ou None
-        result = result[
-            result['pai'].isin(grupos_permitidos) |
-            result['pai'].isna() |
-            (result['pai'] == '')
-        ]
+        # Inclui os grupos selecionados + variações de NA/FORA e PAI vazio
+        grupos_permitidos = [*filters['pai'], *PAI_SEMPRE_MANTIDOS]
+        # Também mantém registros com PAI None
+        mask &= (
+            _isin_mask(df['pai'], grupos_permitidos) |
+            df['pai'].isna().to_numpy()
+        )
 
     # Filtro Faixa CFEM
-    if filters.get('CFEM_range') and 'totalvalorrecolhido' in result.columns:
+    if filters.get('CFEM_range') and 'totalvalorrecolhido' in df.columns:
         cfem_min, cfem_max = filters['CFEM_range']
-        result = result[
-            (result['totalvalorrecolhido'] >= cfem_min) &
-            (result['totalvalorrecolhido'] <= cfem_max)
-        ]
+        cfem = df['totalvalorrecolhido'].to_numpy()
+        # Duas comparações aplicadas direto na máscara (sem o array temporário do &)
+        mask &= cfem >= cfem_min
+        mask &= cfem <= cfem_max
 
     # Filtro Terceiriza
     if filters.get('Terceiriza') and len(filters['Terceiriza']) > 0:
-        result = result[result['terceiriza_lavra?'].isin(filters['Terceiriza'])]
+        mask &= _isin_mask(df['terceiriza_lavra?'], filters['Terceiriza'])
 
-    return result
+    # Sem linhas removidas (estado padrão dos filtros): evita copiar o DataFrame
+    if mask.all():
+        return df
+
+    return df[mask]
 
 
 def format_display_table(df: pd.DataFrame) -> pd.DataFrame:
@@ -589,7 +950,12 @@ def format_display_table(df: pd.DataFrame) -> pd.DataFrame:
 
     # Seleciona apenas colunas que existem
     available_columns = [col for col in display_columns if col in df.columns]
-    result = df[available_columns].copy()
+    result = df[available_columns]
+
+    # Ordena por CFEM decrescente ainda com os valores numéricos originais
+    # (ordenação estável: empates mantêm a ordem do arquivo)
+    if 'totalvalorrecolhido' in df.columns:
+        result = result.sort_values('totalvalorrecolhido', ascending=False, kind='stable')
 
     # Renomeia colunas para exibição mais amigável
     column_names = {
@@ -609,32 +975,15 @@ def format_display_table(df: pd.DataFrame) -> pd.DataFrame:
 
     result = result.rename(columns=column_names)
 
-    # Formata valores numéricos para exibição
+    # Formata valores numéricos para exibição (uma passada por coluna)
     if 'CFEM 2024 (R$)' in result.columns:
-        result['CFEM 2024 (R$)'] = result['CFEM 2024 (R$)'].apply(
-            lambda x: format_currency(x) if pd.notna(x) else 'R$ 0,00'
-        )
+        result['CFEM 2024 (R$)'] = format_currency_series(result['CFEM 2024 (R$)'])
 
     if 'Volume (t)' in result.columns:
-        result['Volume (t)'] = result['Volume (t)'].apply(
-            lambda x: format_number(x, decimals=2) if pd.notna(x) else '0'
-        )
+        result['Volume (t)'] = format_number_series(result['Volume (t)'], decimals=2)
 
     if 'Valor Anual (R$)' in result.columns:
-        result['Valor Anual (R$)'] = result['Valor Anual (R$)'].apply(
-            lambda x: format_currency(x) if pd.notna(x) else 'R$ 0,00'
-        )
-
-    # Ordena por CFEM decrescente (se coluna existe e tem dados numéricos originais)
-    # Como formatamos as strings, precisamos ordenar antes da formatação
-    # Vamos reordenar usando o DataFrame original
-    if 'totalvalorrecolhido' in df.columns:
-        # Pega os índices ordenados
-        sorted_indices = df[available_columns].sort_values(
-            'totalvalorrecolhido',
-            ascending=False
-        ).index
-        result = result.loc[sorted_indices]
+        result['Valor Anual (R$)'] = format_currency_series(result['Valor Anual (R$)'])
 
     return result
 
@@ -643,6 +992,38 @@ def format_display_table(df: pd.DataFrame) -> pd.DataFrame:
 # FUNÇÕES AUXILIARES - ANÁLISE ESTRATÉGICA
 # =====================================================================
 
+def _pareto_cutoff(values: pd.Series, threshold: float = 80.0) -> tuple:
+    """
+    Ordena os valores (decrescente) e seleciona os que somam até o limiar
+
+    Kernel numérico do Pareto: ordena só a coluna de valor, acumula em
+    NumPy e devolve as posições selecionadas, sem ordenar/copiar o
+    DataFrame inteiro.
+
+    Args:
+        values: Coluna de valor
+        threshold: Percentual acumulado máximo
+
+    Returns:
+        Tupla (posições selecionadas na ordem decrescente, % acumulado delas)
+    """
+    # Mesma ordenação de DataFrame.sort_values (nulos no final)
+    order = values.reset_index(drop=True).sort_values(ascending=False).index.to_numpy()
+    sorted_values = values.to_numpy(dtype='float64', na_value=np.nan)[order]
+
+    # cumsum do pandas: ignora nulos, mas mantém NaN nas posições nulas
+    cumulative = np.nancumsum(sorted_values)
+    cumulative[np.isnan(sorted_values)] = np.nan
+    # Divide e multiplica no próprio array (mesma ordem de operações, sem temporários).
+    # Total zero dá NaN/inf como no pandas, que não emite RuntimeWarning
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cumulative /= pd.Series(sorted_values).sum()
+        cumulative *= 100
+
+    keep = cumulative <= threshold
+    return order[keep], cumulative[keep]
+
+
 def calculate_pareto_80(df: pd.DataFrame, group_column: str = None, value_column: str = 'totalvalorrecolhido') -> pd.DataFrame:
     """
     Calcula Pareto: identifica registros que somam 80% do valor total
@@ -657,29 +1038,49 @@ def calculate_pareto_80(df: pd.DataFrame, group_column: str = None, value_column
     """
     if group_column:
         # Agrupa e soma
-        df_grouped = df.groupby(group_column)[value_column].sum().reset_index()
-        df_grouped = df_grouped.sort_values(value_column, ascending=False)
+        df_base = df.groupby(group_column, observed=True)[value_column].sum().reset_index()
+    else:
+        # Trabalha com registros individuais
+        df_base = df
 
-        # Calcula % acumulado
-        total = df_grouped[value_column].sum()
-        df_grouped['percent_acum'] = (df_grouped[value_column].cumsum() / total * 100)
+    # Ordena, calcula % acumulado e filtra até 80% (só as linhas selecionadas são materializadas)
+    positions, percent_acum = _pareto_cutoff(df_base[value_column])
 
-        # Filtra até 80%
-        df_pareto = df_grouped[df_grouped['percent_acum'] <= 80].copy()
+    return df_base.take(positions).assign(percent_acum=percent_acum)
 
-        return df_pareto
-    else:
-        # Trabalha com registros individuais
-        df_sorted = df.sort_values(value_column, ascending=False).copy()
 
-        # Calcula % acumulado
-        total = df_sorted[value_column].sum()
-        df_sorted['percent_acum'] = (df_sorted[value_column].cumsum() / total * 100)
+@st.cache_data(show_spinner=False, max_entries=16)
+def _cached_pareto_80(cache_key: tuple, group_column: str, _df: pd.DataFrame) -> pd.DataFrame:
+    """
+    calculate_pareto_80 em cache por versão do dataset
 
-        # Filtra até 80%
-        df_pareto = df_sorted[df_sorted['percent_acum'] <= 80].copy()
+    Args:
+        cache_key: Chave estável do recorte de entrada (hash do arquivo e
+            identificação do recorte)
+        group_column: Coluna de agrupamento (None = linhas individuais)
+        _df: DataFrame de entrada (não entra no hash)
 
-        return df_pareto
+    Returns:
+        DataFrame do Pareto (até 80% do CFEM)
+    """
+    return calculate_pareto_80(_df, group_column=group_column, value_column='totalvalorrecolhido')
+
+
+def _pareto_80(df: pd.DataFrame, group_column: str = None, cache_key: tuple = None) -> pd.DataFrame:
+    """
+    Pareto 80% do CFEM, vindo do cache quando há chave estável
+
+    Args:
+        df: DataFrame de entrada
+        group_column: Coluna de agrupamento (None = linhas individuais)
+        cache_key: Chave estável do recorte; se None, recalcula
+
+    Returns:
+        DataFrame do Pareto (até 80% do CFEM)
+    """
+    if cache_key is None:
+        return calculate_pareto_80(df, group_column=group_column, value_column='totalvalorrecolhido')
+    return _cached_pareto_80(cache_key, group_column, df)
 
 
 def calculate_tec_weight(tec_value: str) -> int:
@@ -687,42 +1088,84 @@ def calculate_tec_weight(tec_value: str) -> int:
     Retorna peso numérico para cada TEC (usado em score de prioridade)
 
     Args:
-        tec_value: Valor do TEC (ex: 'TEC01', 'TEC02', etc)
+        tec_value: Valor do TEC (ex: 'TEC01', 'TEC02', etc)
+
+    Returns:
+        Peso de 1 a 5
+    """
+    if is_missing(tec_value):
+        return 0
+
+    tec_str = str(tec_value).upper().strip()
+
+    return TEC_WEIGHTS.get(tec_str, 0)
+
+
+def tec_weight_series(tec: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de calculate_tec_weight para uma coluna inteira
+
+    Em colunas category o peso é calculado uma vez por categoria e
+    distribuído pelos códigos; nas demais usa operações .str + map.
+
+    Args:
+        tec: Coluna TEC
+
+    Returns:
+        Série int64 com os pesos (0 para nulos ou TEC desconhecido)
+    """
+    if isinstance(tec.dtype, pd.CategoricalDtype):
+        # Último elemento = peso dos nulos (código -1)
+        weights = np.array(
+            [calculate_tec_weight(c) for c in tec.cat.categories] + [0],
+            dtype='int64'
+        )
+        return pd.Series(weights[tec.cat.codes.to_numpy()], index=tec.index)
+
+    return (
+        tec.astype('string')
+        .str.upper()
+        .str.strip()
+        .map(TEC_WEIGHTS)
+        .fillna(0)
+        .astype('int64')
+    )
+
+
+def priority_score_series(df: pd.DataFrame) -> pd.Series:
+    """
+    Score de prioridade (CFEM × Peso TEC) calculado direto nos arrays
+
+    Args:
+        df: DataFrame com totalvalorrecolhido (e tec, se existir)
 
     Returns:
-        Peso de 1 a 5
+        Série float64 com o score (0 × CFEM quando não há coluna TEC)
     """
-    if pd.isna(tec_value):
-        return 0
-
-    tec_str = str(tec_value).upper().strip()
-
-    weights = {
-        'TEC01': 5,
-        'TEC02': 4,
-        'TEC03': 3,
-        'TEC04': 2,
-        'TEC05': 1
-    }
-
-    return weights.get(tec_str, 0)
+    cfem = df['totalvalorrecolhido'].to_numpy()
+    weights = tec_weight_series(df['tec']).to_numpy() if 'tec' in df.columns else 0
+    return pd.Series(cfem * weights, index=df.index)
 
 
 # =====================================================================
 # SEÇÃO 1: ANÁLISE DE PARETO DE MINAS
 # =====================================================================
 
-def render_secao1_pareto_minas(df: pd.DataFrame) -> None:
+def render_secao1_pareto_minas(df: pd.DataFrame, cache_key: str = None) -> None:
     """
     Renderiza Seção 1: Análise de Pareto de Minas
     - Gráfico de Pareto das ~50 minas que representam 80% do CFEM
     - 4 Cards KPI
+
+    Args:
+        df: DataFrame completo
+        cache_key: Hash do dataset; se informado, o Pareto vem do cache
     """
     st.header("📊 Análise de Pareto - Concentração de Mercado")
     st.caption("Identificação das minas que representam 80% do CFEM total")
 
     # Calcula Pareto (minas que somam 80%)
-    df_pareto = calculate_pareto_80(df, group_column=None, value_column='totalvalorrecolhido')
+    df_pareto = _pareto_80(df, cache_key=(cache_key, 'minas') if cache_key is not None else None)
 
     # Total geral
     total_minas = len(df)
@@ -737,57 +1180,43 @@ def render_secao1_pareto_minas(df: pd.DataFrame) -> None:
     st.subheader("Gráfico de Pareto das Minas")
 
     # Prepara dados para o gráfico
-    df_pareto_chart = df_pareto.copy()
-    df_pareto_chart['index'] = range(1, len(df_pareto_chart) + 1)
+    # (índice do eixo X como array à parte, sem copiar o DataFrame do Pareto)
+    x_index = np.arange(1, len(df_pareto) + 1)
+
+    # Dados do tooltip: um único array (colunas ausentes viram NaN, sem
+    # deslocar as posições usadas no hovertemplate)
+    chave_column = 'chaveprimaria' if 'chaveprimaria' in df_pareto.columns else 'empresa_por_cnpj'
+    customdata = df_pareto.reindex(columns=[chave_column, *PARETO_HOVER_COLUMNS]).to_numpy()
 
     # Cria figura com eixo Y secundário
     fig = go.Figure()
 
     # Barras: CFEM individual
     fig.add_trace(go.Bar(
-        x=df_pareto_chart['index'],
-        y=df_pareto_chart['totalvalorrecolhido'],
+        x=x_index,
+        y=df_pareto['totalvalorrecolhido'],
         name='CFEM Individual',
         marker=dict(
             color='#95A3B3',
             showscale=False
         ),
-        customdata=df_pareto_chart[[
-            'chaveprimaria' if 'chaveprimaria' in df_pareto_chart.columns else 'empresa_por_cnpj',
-            'pai',
-            'município',
-            'uf',
-            'substanciamaiscomercializada',
-            'totalvalorrecolhido',
-            'status_mapeamento',
-            'primeiro_escopo',
-            'valor_total_mensal',
-            'valor_anual_mapeado',
-            'tec'
-        ]].values if all(col in df_pareto_chart.columns for col in ['pai', 'município', 'uf', 'substanciamaiscomercializada', 'status_mapeamento']) else None,
-        hovertemplate="<b>%{customdata[0]}</b><br>" +
-                      "🏢 Grupo: %{customdata[1]}<br>" +
-                      "📍 Localização: %{customdata[2]} - %{customdata[3]}<br>" +
-                      "⛏️ Substância: %{customdata[4]}<br>" +
-                      "💰 CFEM 2024: R$ %{customdata[5]:,.2f}<br>" +
-                      "📊 Status: %{customdata[6]}<br>" +
-                      "📋 Escopo: %{customdata[7]}<br>" +
-                      "💵 Valor Mensal: R$ %{customdata[8]:,.2f}<br>" +
-                      "💰 Valor Anual: R$ %{customdata[9]:,.2f}<br>" +
-                      "🎯 TEC: %{customdata[10]}<br>" +
-                      "<extra></extra>"
+        customdata=customdata,
+        hovertemplate=PARETO_MINAS_HOVERTEMPLATE
     ))
 
-    # Linha: % acumulado
-    fig.add_trace(go.Scatter(
-        x=df_pareto_chart['index'],
-        y=df_pareto_chart['percent_acum'],
+    # Linha: % acumulado (em Paretos grandes, WebGL e sem marcadores:
+    # o SVG cria um nó por ponto e trava o hover com milhares de minas)
+    large_pareto = len(df_pareto) > PARETO_WEBGL_THRESHOLD
+    scatter_trace = go.Scattergl if large_pareto else go.Scatter
+    fig.add_trace(scatter_trace(
+        x=x_index,
+        y=df_pareto['percent_acum'],
         name='% Acumulado',
         yaxis='y2',
         line=dict(color='#FF6B35', width=3),
-        mode='lines+markers',
+        mode='lines' if large_pareto else 'lines+markers',
         marker=dict(size=4),
-        hovertemplate="Acumulado: %{y:.1f}%<extra></extra>"
+        hovertemplate=PARETO_ACUMULADO_HOVERTEMPLATE
     ))
 
     # Linha vertical no ponto de 80%
@@ -821,12 +1250,36 @@ def render_secao1_pareto_minas(df: pd.DataFrame) -> None:
         margin=dict(l=10, r=10, t=40, b=10),
         hovermode='closest',
         showlegend=True,
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        # Mantém o estado de zoom/legenda entre reruns, sem novo relayout
+        uirevision='pareto_minas'
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    config = {'displayModeBar': len(df_pareto) <= PARETO_MODEBAR_THRESHOLD}
+    st.plotly_chart(fig, use_container_width=True, config=config)
 
     # === B) 4 CARDS KPI ===
+    # Métricas dos 4 cards calculadas num único bloco sobre o Pareto
+    # (máscara de mapeadas e contagem por TEC feitas uma única vez)
+    mask_sim_pareto = (df_pareto['status_mapeamento'] == 'Sim').to_numpy() if 'status_mapeamento' in df_pareto.columns else None
+
+    # Card 2: Mapeamento
+    minas_mapeadas_pareto = int(mask_sim_pareto.sum()) if mask_sim_pareto is not None else 0
+    perc_mapeadas_pareto = (minas_mapeadas_pareto / qtd_minas_pareto * 100) if qtd_minas_pareto > 0 else 0
+    gap_pareto = qtd_minas_pareto - minas_mapeadas_pareto
+
+    # Card 3: Valor Capturado
+    valor_anual_pareto = df_pareto['valor_anual_mapeado'][mask_sim_pareto].sum() if 'valor_anual_mapeado' in df_pareto.columns and mask_sim_pareto is not None else 0
+    valor_anual_pareto_bi = valor_anual_pareto / 1_000_000_000
+    cfem_pareto_bi = cfem_pareto / 1_000_000_000
+    taxa_captura = (valor_anual_pareto / cfem_pareto * 100) if cfem_pareto > 0 else 0
+
+    # Card 4: Distribuição por TEC (uma contagem única nas 5 TECs)
+    if 'tec' in df_pareto.columns:
+        tec01, tec02, tec03, tec04, tec05 = count_values(df_pareto['tec'], list(TEC_WEIGHTS))
+    else:
+        tec01 = tec02 = tec03 = tec04 = tec05 = 0
+
     col1, col2, col3, col4 = st.columns(4)
 
     # Card 1: Concentração 80%
@@ -839,10 +1292,6 @@ def render_secao1_pareto_minas(df: pd.DataFrame) -> None:
         st.markdown(f'<p style="margin: 0; color: #2D3142; font-size: 0.95rem;">{format_currency_abbreviated(cfem_pareto)} em CFEM</p>', unsafe_allow_html=True)
 
     # Card 2: Mapeamento
-    minas_mapeadas_pareto = len(df_pareto[df_pareto['status_mapeamento'] == 'Sim']) if 'status_mapeamento' in df_pareto.columns else 0
-    perc_mapeadas_pareto = (minas_mapeadas_pareto / qtd_minas_pareto * 100) if qtd_minas_pareto > 0 else 0
-    gap_pareto = qtd_minas_pareto - minas_mapeadas_pareto
-
     with col2:
         st.metric(
             "📊 Minas Mapeadas no Pareto",
@@ -852,11 +1301,6 @@ def render_secao1_pareto_minas(df: pd.DataFrame) -> None:
         st.markdown(f'<p style="margin: 0; color: #2D3142; font-size: 0.95rem;">Gap: {gap_pareto} minas prioritárias</p>', unsafe_allow_html=True)
 
     # Card 3: Valor Capturado
-    valor_anual_pareto = df_pareto[df_pareto['status_mapeamento'] == 'Sim']['valor_anual_mapeado'].sum() if 'valor_anual_mapeado' in df_pareto.columns else 0
-    valor_anual_pareto_bi = valor_anual_pareto / 1_000_000_000
-    cfem_pareto_bi = cfem_pareto / 1_000_000_000
-    taxa_captura = (valor_anual_pareto / cfem_pareto * 100) if cfem_pareto > 0 else 0
-
     with col3:
         st.metric(
             "💰 Valor Anual Capturado",
@@ -865,13 +1309,6 @@ def render_secao1_pareto_minas(df: pd.DataFrame) -> None:
         st.markdown(f'<p style="margin: 0; color: #2D3142; font-size: 0.95rem;">Potencial: R$ {cfem_pareto_bi:.2f} Bi | Captura: {taxa_captura:.1f}%</p>', unsafe_allow_html=True)
 
     # Card 4: Distribuição por TEC
-    tec_counts = df_pareto['tec'].value_counts() if 'tec' in df_pareto.columns else pd.Series()
-    tec01 = tec_counts.get('TEC01', 0)
-    tec02 = tec_counts.get('TEC02', 0)
-    tec03 = tec_counts.get('TEC03', 0)
-    tec04 = tec_counts.get('TEC04', 0)
-    tec05 = tec_counts.get('TEC05', 0)
-
     with col4:
         st.metric(
             "🎯 Distribuição por TEC",
@@ -880,46 +1317,200 @@ def render_secao1_pareto_minas(df: pd.DataFrame) -> None:
         st.markdown(f'<p style="margin: 0; color: #2D3142; font-size: 0.95rem;">TEC03: {tec03} | TEC04: {tec04} | TEC05: {tec05}</p>', unsafe_allow_html=True)
 
 
+# =====================================================================
+# TABELAS TOP N (colunas montadas de forma vetorizada)
+# =====================================================================
+
+def _top_n_positions(score: np.ndarray, n: int) -> np.ndarray:
+    """
+    Posições dos N maiores valores de score, em ordem decrescente
+
+    Seleção parcial (np.partition) até o N-ésimo maior valor e ordenação
+    estável só dos candidatos: empates saem na ordem do arquivo, como no
+    nlargest(keep='first'). Nulos só entram, no fim, se faltarem valores.
+
+    Args:
+        score: Array com o score de cada linha
+        n: Quantidade de posições
+
+    Returns:
+        Array de posições (inteiras) com até N elementos
+    """
+    nulos = np.isnan(score)
+    candidatos = np.flatnonzero(~nulos)
+
+    if n < len(candidatos):
+        valores = score[candidatos]
+        corte = len(valores) - n
+        kth = np.partition(valores, corte)[corte]
+        candidatos = candidatos[valores >= kth]
+
+    positions = candidatos[np.argsort(-score[candidatos], kind='stable')][:n]
+
+    if len(positions) < n:
+        positions = np.concatenate([positions, np.flatnonzero(nulos)[:n - len(positions)]])
+
+    return positions
+
+
+def top_by_priority_score(df: pd.DataFrame, n: int) -> pd.DataFrame:
+    """
+    TOP N linhas por score de prioridade (CFEM × Peso TEC)
+
+    O score é calculado como array e só as N linhas selecionadas são
+    materializadas, já com a coluna score_prioridade; o DataFrame de
+    entrada não é alterado nem copiado. Mesmo resultado de
+    df.assign(score_prioridade=...).nlargest(n, 'score_prioridade'), com
+    empates sempre na ordem do arquivo.
+
+    Args:
+        df: Linhas candidatas
+        n: Quantidade de linhas
+
+    Returns:
+        DataFrame com as N linhas em ordem decrescente de score
+    """
+    score = priority_score_series(df).to_numpy()
+    positions = _top_n_positions(score, n)
+    return df.take(positions).assign(score_prioridade=score[positions])
+
+
+def _chave_column(df: pd.DataFrame) -> str:
+    """
+    Coluna que identifica a mina nas tabelas (chaveprimaria ou CNPJ)
+    """
+    return 'chaveprimaria' if 'chaveprimaria' in df.columns else 'empresa_por_cnpj'
+
+
+def _table_values(df: pd.DataFrame, column: str, default='N/A') -> np.ndarray:
+    """
+    Valores crus de uma coluna para a tabela (default se não existir)
+
+    Args:
+        df: Linhas da tabela
+        column: Nome da coluna
+        default: Valor usado quando a coluna não existe
+
+    Returns:
+        Array com um valor por linha
+    """
+    if column not in df.columns:
+        return np.full(len(df), default, dtype=object)
+    return df[column].to_numpy()
+
+
+def _table_text(df: pd.DataFrame, column: str, max_len: int, default: str = 'N/A') -> np.ndarray:
+    """
+    Coluna convertida para texto e truncada (equivale a str(valor)[:max_len])
+
+    Args:
+        df: Linhas da tabela
+        column: Nome da coluna
+        max_len: Nº máximo de caracteres
+        default: Texto usado quando a coluna não existe
+
+    Returns:
+        Array de strings
+    """
+    if column not in df.columns:
+        return np.full(len(df), default[:max_len], dtype=object)
+    return df[column].astype(str).str.slice(0, max_len).to_numpy()
+
+
+def _table_currency(df: pd.DataFrame, column: str) -> List[str]:
+    """
+    Coluna monetária formatada com format_currency_abbreviated
+
+    Args:
+        df: Linhas da tabela
+        column: Nome da coluna
+
+    Returns:
+        Lista de strings (R$ 0,00 quando a coluna não existe)
+    """
+    if column not in df.columns:
+        return ["R$ 0,00"] * len(df)
+    return [format_currency_abbreviated(v) for v in df[column].to_numpy()]
+
+
+def _table_score(df: pd.DataFrame) -> List[str]:
+    """
+    Score de prioridade sem casas decimais e com milhar em ponto
+
+    Args:
+        df: Linhas da tabela (com score_prioridade)
+
+    Returns:
+        Lista de strings
+    """
+    return [f"{v:,.0f}".replace(',', '.') for v in df['score_prioridade'].to_numpy()]
+
+
 # =====================================================================
 # SEÇÃO 2: ANÁLISE DE GRUPOS/HOLDINGS
 # =====================================================================
 
-def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
+def _nan_to_zero(series: pd.Series) -> np.ndarray:
     """
-    Renderiza Seção 2: Análise de Grupos/Holdings
-    - Gráfico Pareto por Grupo (TOP 15)
-    - 3 Cards KPI
-    - Tabela TOP 10 Grupos
+    Valores float64 com nulos como 0 (mesma base usada por Series.sum)
+
+    Args:
+        series: Coluna numérica
+
+    Returns:
+        Array float64
     """
-    st.markdown("---")
-    st.header("🏢 Análise de Grupos/Holdings")
-    st.caption("Concentração por grupos empresariais e oportunidades")
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    return np.where(np.isnan(values), 0.0, values)
 
-    # Filtra grupos (excluindo NA/FORA)
-    df_com_grupo = df[~df['pai'].isin(['NA', 'FORA', 'na', 'fora', '']) & df['pai'].notna()].copy()
 
-    # === A) GRÁFICO: PARETO POR GRUPO ===
-    st.subheader("Pareto por Grupo Empresarial")
+def calculate_grupos_info(df_com_grupo: pd.DataFrame, grupos: pd.Series) -> List[Dict]:
+    """
+    Informações do tooltip do Pareto por grupo (7 campos por grupo)
 
-    # Calcula Pareto por grupo
-    df_grupos_pareto = calculate_pareto_80(df_com_grupo, group_column='pai', value_column='totalvalorrecolhido')
+    As posições de cada grupo saem de uma única passada de get_indexer
+    (em colunas category, sobre o dicionário de categorias) em vez de uma
+    máscara booleana por grupo; as somas são feitas sobre os mesmos
+    valores, na ordem original, e por isso coincidem com df_grupo[col].sum().
 
-    # Pega TOP 15 grupos para o gráfico
-    top15_grupos = df_grupos_pareto.head(15).copy()
+    Args:
+        df_com_grupo: Minas com grupo (sem NA/FORA)
+        grupos: Grupos a detalhar, na ordem do gráfico
 
-    # Prepara informações adicionais para tooltip (7 campos focados em análise de grupos)
+    Returns:
+        Lista de dicionários, um por grupo
+    """
+    grupos = list(grupos)
+    empty = np.array([], dtype='int64')
+
+    # Código de cada linha na lista de grupos (-1 = fora da lista) e
+    # posições agrupadas por grupo, mantendo a ordem original das linhas
+    codes = pd.Index(grupos).get_indexer(df_com_grupo['pai'])
+    positions = np.flatnonzero(codes >= 0)
+    positions = positions[np.argsort(codes[positions], kind='stable')]
+    counts = np.bincount(codes[codes >= 0], minlength=len(grupos))
+    indices = np.split(positions, np.cumsum(counts)[:-1]) if len(grupos) > 0 else []
+
+    cfem = _nan_to_zero(df_com_grupo['totalvalorrecolhido'])
     cfem_total_geral = df_com_grupo['totalvalorrecolhido'].sum()
+
+    has_status = 'status_mapeamento' in df_com_grupo.columns
+    if has_status:
+        mapeada = (df_com_grupo['status_mapeamento'] == 'Sim').to_numpy(dtype=bool)
+    valor_mensal_all = _nan_to_zero(df_com_grupo['valor_total_mensal']) if 'valor_total_mensal' in df_com_grupo.columns else None
+    valor_anual_all = _nan_to_zero(df_com_grupo['valor_anual_mapeado']) if 'valor_anual_mapeado' in df_com_grupo.columns else None
+
     grupos_info = []
-    for grupo in top15_grupos['pai']:
-        df_grupo = df_com_grupo[df_com_grupo['pai'] == grupo]
-        qtd_minas = len(df_grupo)
-        cfem_grupo = df_grupo['totalvalorrecolhido'].sum()
+    for grupo, idx in zip(grupos, indices):
+        qtd_minas = len(idx)
+        cfem_grupo = cfem[idx].sum()
         perc_cfem_total = (cfem_grupo / cfem_total_geral * 100) if cfem_total_geral > 0 else 0
 
-        qtd_mapeadas = len(df_grupo[df_grupo['status_mapeamento'] == 'Sim']) if 'status_mapeamento' in df_grupo.columns else 0
+        idx_mapeadas = idx[mapeada[idx]] if has_status else empty
+        qtd_mapeadas = len(idx_mapeadas) if has_status else 0
         perc_mapeadas = (qtd_mapeadas / qtd_minas * 100) if qtd_minas > 0 else 0
-        valor_mensal = df_grupo[df_grupo['status_mapeamento'] == 'Sim']['valor_total_mensal'].sum() if 'valor_total_mensal' in df_grupo.columns else 0
-        valor_anual = df_grupo[df_grupo['status_mapeamento'] == 'Sim']['valor_anual_mapeado'].sum() if 'valor_anual_mapeado' in df_grupo.columns else 0
+        valor_mensal = valor_mensal_all[idx_mapeadas].sum() if valor_mensal_all is not None else 0
+        valor_anual = valor_anual_all[idx_mapeadas].sum() if valor_anual_all is not None else 0
 
         grupos_info.append({
             'grupo': grupo,
@@ -932,15 +1523,63 @@ def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
             'valor_anual': valor_anual
         })
 
+    return grupos_info
+
+
+def render_secao2_analise_grupos(df: pd.DataFrame, cache_key: str = None, mask_grupo: np.ndarray = None,
+                                 mask_nao: np.ndarray = None) -> None:
+    """
+    Renderiza Seção 2: Análise de Grupos/Holdings
+    - Gráfico Pareto por Grupo (TOP 15)
+    - 3 Cards KPI
+    - Tabela TOP 10 Grupos
+
+    Args:
+        df: DataFrame completo
+        cache_key: Hash do dataset; se informado, o Pareto vem do cache
+        mask_grupo: Máscara de minas com grupo (mask_com_grupo); se None,
+            é calculada aqui
+        mask_nao: Máscara de minas não mapeadas sobre df; se None, é
+            calculada aqui
+    """
+    st.markdown("---")
+    st.header("🏢 Análise de Grupos/Holdings")
+    st.caption("Concentração por grupos empresariais e oportunidades")
+
+    # Filtra grupos (excluindo NA/FORA); somente leitura, sem cópia
+    if mask_grupo is None:
+        mask_grupo = mask_com_grupo(df)
+    df_com_grupo = df[mask_grupo]
+
+    # Não mapeadas restritas às minas com grupo (alinhada a df_com_grupo)
+    if mask_nao is None and 'status_mapeamento' in df.columns:
+        mask_nao = (df['status_mapeamento'] == 'Não').to_numpy()
+    mask_nao_grupo = mask_nao[mask_grupo] if mask_nao is not None else None
+
+    # === A) GRÁFICO: PARETO POR GRUPO ===
+    st.subheader("Pareto por Grupo Empresarial")
+
+    # Calcula Pareto por grupo
+    df_grupos_pareto = _pareto_80(
+        df_com_grupo, group_column='pai',
+        cache_key=(cache_key, 'grupos') if cache_key is not None else None
+    )
+
+    # Pega TOP 15 grupos para o gráfico
+    top15_grupos = df_grupos_pareto.head(15)
+
+    # Prepara informações adicionais para tooltip (7 campos focados em análise de grupos)
+    grupos_info = calculate_grupos_info(df_com_grupo, top15_grupos['pai'])
+
     # Gráfico de barras verticais + linha (padronizado com gráfico de Minas)
     fig = go.Figure()
 
     # Prepara índice para eixo X
-    top15_grupos['index'] = range(1, len(top15_grupos) + 1)
+    x_index = np.arange(1, len(top15_grupos) + 1)
 
     # Barras verticais
     fig.add_trace(go.Bar(
-        x=top15_grupos['index'],
+        x=x_index,
         y=top15_grupos['totalvalorrecolhido'],
         name='CFEM por Grupo',
         marker=dict(
@@ -957,26 +1596,19 @@ def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
             info['valor_mensal'],
             info['valor_anual']
         ] for info in grupos_info],
-        hovertemplate="<b>Grupo: %{customdata[0]}</b><br>" +
-                      "🏭 Minas: %{customdata[1]} minas<br>" +
-                      "💰 CFEM: R$ %{customdata[2]:,.2f}<br>" +
-                      "📊 Representa: %{customdata[3]:.1f}% do CFEM total<br>" +
-                      "✅ Mapeadas: %{customdata[4]} de %{customdata[1]} (%{customdata[5]:.1f}%)<br>" +
-                      "💵 Valor Mensal: R$ %{customdata[6]:,.2f}<br>" +
-                      "💰 Valor Anual: R$ %{customdata[7]:,.2f}<br>" +
-                      "<extra></extra>"
+        hovertemplate=PARETO_GRUPOS_HOVERTEMPLATE
     ))
 
     # Linha de % acumulado (no eixo Y secundário direito)
     fig.add_trace(go.Scatter(
-        x=top15_grupos['index'],
+        x=x_index,
         y=top15_grupos['percent_acum'],
         name='% Acumulado',
         yaxis='y2',
         mode='lines+markers',
         line=dict(color='#FF6B35', width=3),
         marker=dict(size=4),
-        hovertemplate="Acumulado: %{y:.1f}%<extra></extra>"
+        hovertemplate=PARETO_ACUMULADO_HOVERTEMPLATE
     ))
 
     # Linha horizontal no ponto de 80%
@@ -1019,8 +1651,12 @@ def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
     col1, col2, col3, col4 = st.columns(4)
 
     # Card 1: Concentração por Grupos (MANTÉM)
+    # Minas dos grupos do Pareto (recorte reusado pelos cards 1 a 4)
+    mask_top = df_com_grupo['pai'].isin(df_grupos_pareto['pai']).to_numpy()
+    df_grupos_top = df_com_grupo[mask_top]
+
     qtd_grupos_pareto = len(df_grupos_pareto)
-    qtd_minas_grupos_pareto = len(df_com_grupo[df_com_grupo['pai'].isin(df_grupos_pareto['pai'])])
+    qtd_minas_grupos_pareto = len(df_grupos_top)
     cfem_grupos_pareto = df_grupos_pareto['totalvalorrecolhido'].sum()
 
     with col1:
@@ -1031,10 +1667,8 @@ def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
         st.markdown(f'<p style="margin: 0; color: #2D3142; font-size: 0.95rem;">Controlam {qtd_minas_grupos_pareto:,}'.replace(',', '.') + f' minas | {format_currency_abbreviated(cfem_grupos_pareto)}</p>', unsafe_allow_html=True)
 
     # Card 2: TOP 3 Substâncias nos Grupos Pareto (NOVO)
-    df_grupos_top = df_com_grupo[df_com_grupo['pai'].isin(df_grupos_pareto['pai'])]
-
     if 'substanciamaiscomercializada' in df_grupos_top.columns:
-        top3_substancias = df_grupos_top.groupby('substanciamaiscomercializada')['totalvalorrecolhido'].sum().nlargest(3)
+        top3_substancias = df_grupos_top.groupby('substanciamaiscomercializada', observed=True)['totalvalorrecolhido'].sum().nlargest(3)
         cfem_total_pareto = df_grupos_top['totalvalorrecolhido'].sum()
 
         with col2:
@@ -1056,10 +1690,11 @@ def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
 
     # Card 3: TOP 3 Estados nos Grupos Pareto (NOVO)
     if 'uf' in df_grupos_top.columns:
-        top3_estados = df_grupos_top.groupby('uf').agg({
-            'chaveprimaria': 'count',  # Conta minas
-            'totalvalorrecolhido': 'sum'  # Soma CFEM
-        }).rename(columns={'chaveprimaria': 'qtd_minas', 'totalvalorrecolhido': 'cfem'})
+        # Contagem de minas e soma de CFEM em um único groupby, já com os nomes finais
+        top3_estados = df_grupos_top.groupby('uf', observed=True).agg(
+            qtd_minas=('chaveprimaria', 'count'),
+            cfem=('totalvalorrecolhido', 'sum')
+        )
         top3_estados = top3_estados.sort_values('qtd_minas', ascending=False).head(3)
 
         with col3:
@@ -1080,10 +1715,12 @@ def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
 
     # Card 4: Grupos com Oportunidades (ADAPTADO)
     # Identifica grupos que TÊM pelo menos 1 mina não mapeada
-    grupos_com_gap = df_grupos_top[df_grupos_top['status_mapeamento'] == 'Não']['pai'].nunique() if 'status_mapeamento' in df_grupos_top.columns else 0
+    # (máscara de não mapeadas recebida da página, só recortada aqui)
+    mask_nao_top = mask_nao_grupo[mask_top] if mask_nao_grupo is not None else None
+    grupos_com_gap = count_distinct(df_grupos_top['pai'][mask_nao_top]) if mask_nao_top is not None else 0
 
     # CFEM e minas não mapeadas nos grupos TOP
-    df_minas_nao_mapeadas = df_grupos_top[df_grupos_top['status_mapeamento'] == 'Não'] if 'status_mapeamento' in df_grupos_top.columns else df_grupos_top
+    df_minas_nao_mapeadas = df_grupos_top[mask_nao_top] if mask_nao_top is not None else df_grupos_top
     cfem_gap_grupos = df_minas_nao_mapeadas['totalvalorrecolhido'].sum()
     qtd_minas_gap_grupos = len(df_minas_nao_mapeadas)
 
@@ -1101,39 +1738,32 @@ def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
     top10_grupos = df_grupos_pareto.head(10)['pai'].tolist()
 
     # 2. Filtra minas NÃO MAPEADAS desses grupos
-    df_minas_top_grupos = df_com_grupo[df_com_grupo['pai'].isin(top10_grupos)]
-    df_minas_nao_mapeadas_top = df_minas_top_grupos[df_minas_top_grupos['status_mapeamento'] == 'Não'].copy() if 'status_mapeamento' in df_minas_top_grupos.columns else df_minas_top_grupos.copy()
+    mask_top10 = df_com_grupo['pai'].isin(top10_grupos).to_numpy()
+    if mask_nao_grupo is not None:
+        mask_top10 &= mask_nao_grupo
+    df_minas_nao_mapeadas_top = df_com_grupo[mask_top10]
 
     if len(df_minas_nao_mapeadas_top) > 0:
-        # 3. Calcula score de prioridade (CFEM × Peso TEC)
-        df_minas_nao_mapeadas_top['tec_weight'] = df_minas_nao_mapeadas_top['tec'].apply(calculate_tec_weight) if 'tec' in df_minas_nao_mapeadas_top.columns else 0
-        df_minas_nao_mapeadas_top['score_prioridade'] = df_minas_nao_mapeadas_top['totalvalorrecolhido'] * df_minas_nao_mapeadas_top['tec_weight']
-
-        # 4. Ordena por score decrescente
-        df_minas_nao_mapeadas_top = df_minas_nao_mapeadas_top.sort_values('score_prioridade', ascending=False)
-
-        # 5. Pega TOP 20 minas
-        df_top20_minas = df_minas_nao_mapeadas_top.head(20)
-
-        # 6. Prepara dados para exibição (8 colunas)
-        tabela_minas = []
-        for idx, row in enumerate(df_top20_minas.itertuples(), 1):
-            tabela_minas.append({
-                '#': idx,
-                'Mina': str(getattr(row, 'chaveprimaria', getattr(row, 'empresa_por_cnpj', 'N/A')))[:40],
-                'Grupo': str(getattr(row, 'pai', 'N/A'))[:25],
-                'UF': getattr(row, 'uf', 'N/A'),
-                'Município': str(getattr(row, 'município', 'N/A'))[:25],
-                'Substância': str(getattr(row, 'substanciamaiscomercializada', 'N/A'))[:20],
-                'CFEM 2024': format_currency_abbreviated(getattr(row, 'totalvalorrecolhido', 0)),
-                'TEC': getattr(row, 'tec', 'N/A'),
-                'Score': f"{getattr(row, 'score_prioridade', 0):,.0f}".replace(',', '.')
-            })
-
-        df_tabela_minas = pd.DataFrame(tabela_minas)
-
-        # 7. Exibe tabela simples (sem styling complexo)
-        st.dataframe(df_tabela_minas, use_container_width=True, height=450)
+        # 3-5. Score de prioridade (CFEM × Peso TEC) e TOP 20 minas por score
+        # decrescente (seleção parcial; empates na ordem do arquivo)
+        df_top20_minas = top_by_priority_score(df_minas_nao_mapeadas_top, 20)
+
+        # 6. Prepara dados para exibição (8 colunas, montadas por coluna)
+        df_tabela_minas = pd.DataFrame({
+            '#': np.arange(1, len(df_top20_minas) + 1),
+            'Mina': _table_text(df_top20_minas, _chave_column(df_top20_minas), 40),
+            'Grupo': _table_text(df_top20_minas, 'pai', 25),
+            'UF': _table_values(df_top20_minas, 'uf'),
+            'Município': _table_text(df_top20_minas, 'município', 25),
+            'Substância': _table_text(df_top20_minas, 'substanciamaiscomercializada', 20),
+            'CFEM 2024': _table_currency(df_top20_minas, 'totalvalorrecolhido'),
+            'TEC': _table_values(df_top20_minas, 'tec'),
+            'Score': _table_score(df_top20_minas)
+        })
+
+        # 7. Exibe tabela simples (sem styling complexo; a coluna '#' já
+        # numera as linhas, então o índice não é enviado)
+        st.dataframe(df_tabela_minas, use_container_width=True, height=450, hide_index=True)
 
         # 8. Nota explicativa
         st.caption("💡 **Score de Prioridade** = CFEM × Peso TEC (TEC01=5, TEC02=4, TEC03=3, TEC04=2, TEC05=1)")
@@ -1145,18 +1775,28 @@ def render_secao2_analise_grupos(df: pd.DataFrame) -> None:
 # SEÇÃO 3: GAP DE OPORTUNIDADES
 # =====================================================================
 
-def render_secao3_gap_oportunidades(df: pd.DataFrame) -> None:
+def render_secao3_gap_oportunidades(df: pd.DataFrame, mask_grupo: np.ndarray = None,
+                                    mask_nao: np.ndarray = None) -> None:
     """
     Renderiza Seção 3: GAP de Oportunidades
     - 4 Cards de GAP
     - Tabela TOP 20 Oportunidades Não Mapeadas
+
+    Args:
+        df: DataFrame completo
+        mask_grupo: Máscara de minas com grupo (mask_com_grupo); se None,
+            é calculada aqui
+        mask_nao: Máscara de minas não mapeadas; se None, é calculada aqui
     """
     st.markdown("---")
     st.header("🎯 GAP de Oportunidades - Minas Não Mapeadas")
     st.caption("Priorização de ações comerciais em minas de alto valor não mapeadas")
 
     # Filtra minas não mapeadas
-    df_gap = df[df['status_mapeamento'] == 'Não'].copy() if 'status_mapeamento' in df.columns else df.copy()
+    mask_gap = mask_nao
+    if mask_gap is None and 'status_mapeamento' in df.columns:
+        mask_gap = (df['status_mapeamento'] == 'Não').to_numpy()
+    df_gap = df[mask_gap] if mask_gap is not None else df
 
     # === A) 4 CARDS DE GAP ===
     col1, col2, col3, col4 = st.columns(4)
@@ -1165,7 +1805,7 @@ def render_secao3_gap_oportunidades(df: pd.DataFrame) -> None:
     qtd_nao_mapeadas = len(df_gap)
     cfem_gap = df_gap['totalvalorrecolhido'].sum()
     cfem_gap_bi = cfem_gap / 1_000_000_000
-    grupos_gap = df_gap['pai'].nunique() if 'pai' in df_gap.columns else 0
+    grupos_gap = count_distinct(df_gap['pai']) if 'pai' in df_gap.columns else 0
 
     with col1:
         st.metric(
@@ -1211,14 +1851,16 @@ def render_secao3_gap_oportunidades(df: pd.DataFrame) -> None:
 
     # Card 4: Concentração do GAP
     if len(df_gap) > 0 and 'uf' in df_gap.columns:
-        top_ufs_gap = df_gap.groupby('uf')['totalvalorrecolhido'].sum().nlargest(3)
+        top_ufs_gap = df_gap.groupby('uf', observed=True)['totalvalorrecolhido'].sum().nlargest(3)
         top3_ufs = ", ".join(top_ufs_gap.index[:3])
     else:
         top3_ufs = "N/A"
 
     if len(df_gap) > 0 and 'pai' in df_gap.columns:
-        df_gap_grupos = df_gap[~df_gap['pai'].isin(['NA', 'FORA', 'na', 'fora', '']) & df_gap['pai'].notna()]
-        top_grupos_gap = df_gap_grupos.groupby('pai')['totalvalorrecolhido'].sum().nlargest(3)
+        if mask_grupo is None:
+            mask_grupo = mask_com_grupo(df)
+        df_gap_grupos = df_gap[mask_grupo[mask_gap] if mask_gap is not None else mask_grupo]
+        top_grupos_gap = df_gap_grupos.groupby('pai', observed=True)['totalvalorrecolhido'].sum().nlargest(3)
         top3_grupos = ", ".join(top_grupos_gap.index[:3])
     else:
         top3_grupos = "N/A"
@@ -1235,30 +1877,22 @@ def render_secao3_gap_oportunidades(df: pd.DataFrame) -> None:
     st.subheader("TOP 20 Oportunidades Não Mapeadas - Score de Prioridade")
 
     if len(df_gap) > 0:
-        # Calcula score de prioridade
-        df_gap['tec_weight'] = df_gap['tec'].apply(calculate_tec_weight) if 'tec' in df_gap.columns else 0
-        df_gap['score_prioridade'] = df_gap['totalvalorrecolhido'] * df_gap['tec_weight']
-
-        # Ordena e pega TOP 20
-        df_top20_opp = df_gap.nlargest(20, 'score_prioridade').copy()
-
-        # Prepara dados para exibição
-        tabela_opp = []
-        for idx, row in enumerate(df_top20_opp.itertuples(), 1):
-            tabela_opp.append({
-                '#': idx,
-                'Mina/Chave': str(getattr(row, 'chaveprimaria', getattr(row, 'empresa_por_cnpj', 'N/A')))[:40],
-                'Grupo': str(getattr(row, 'pai', 'N/A'))[:25],
-                'UF': getattr(row, 'uf', 'N/A'),
-                'Substância': str(getattr(row, 'substanciamaiscomercializada', 'N/A'))[:20],
-                'CFEM (R$)': format_currency_abbreviated(getattr(row, 'totalvalorrecolhido', 0)),
-                'TEC': getattr(row, 'tec', 'N/A'),
-                'Score': f"{getattr(row, 'score_prioridade', 0):,.0f}".replace(',', '.')
-            })
-
-        df_tabela_opp = pd.DataFrame(tabela_opp)
-
-        st.dataframe(df_tabela_opp, use_container_width=True, height=450)
+        # Calcula score de prioridade, ordena e pega TOP 20
+        df_top20_opp = top_by_priority_score(df_gap, 20)
+
+        # Prepara dados para exibição (montados por coluna)
+        df_tabela_opp = pd.DataFrame({
+            '#': np.arange(1, len(df_top20_opp) + 1),
+            'Mina/Chave': _table_text(df_top20_opp, _chave_column(df_top20_opp), 40),
+            'Grupo': _table_text(df_top20_opp, 'pai', 25),
+            'UF': _table_values(df_top20_opp, 'uf'),
+            'Substância': _table_text(df_top20_opp, 'substanciamaiscomercializada', 20),
+            'CFEM (R$)': _table_currency(df_top20_opp, 'totalvalorrecolhido'),
+            'TEC': _table_values(df_top20_opp, 'tec'),
+            'Score': _table_score(df_top20_opp)
+        })
+
+        st.dataframe(df_tabela_opp, use_container_width=True, height=450, hide_index=True)
 
         st.caption("💡 **Score de Prioridade** = CFEM × Peso TEC (TEC01=5, TEC02=4, TEC03=3, TEC04=2, TEC05=1)")
     else:
@@ -1269,34 +1903,43 @@ def render_secao3_gap_oportunidades(df: pd.DataFrame) -> None:
 # FUNÇÃO PRINCIPAL: RENDERIZA ANÁLISE ESTRATÉGICA COMPLETA
 # =====================================================================
 
-def render_analise_estrategica_section(df: pd.DataFrame) -> None:
+def render_analise_estrategica_section(df: pd.DataFrame, cache_key: str = None) -> None:
     """
     Renderiza a página completa de Análise Estratégica
     Integra as 3 seções principais
 
     Args:
         df: DataFrame completo (sem filtros na Fase 1)
+        cache_key: Hash do dataset; se informado, os cálculos de Pareto
+            vêm do cache em vez de refeitos a cada rerun
     """
     # SEÇÃO 1: Análise de Pareto de Minas
-    render_secao1_pareto_minas(df)
+    render_secao1_pareto_minas(df, cache_key=cache_key)
+
+    # Máscaras de minas com grupo e de não mapeadas (o GAP), calculadas
+    # uma vez para as seções 2 e 3
+    mask_grupo = mask_com_grupo(df) if 'pai' in df.columns else None
+    mask_nao = (df['status_mapeamento'] == 'Não').to_numpy() if 'status_mapeamento' in df.columns else None
 
     # SEÇÃO 2: Análise de Grupos/Holdings
-    render_secao2_analise_grupos(df)
+    render_secao2_analise_grupos(df, cache_key=cache_key, mask_grupo=mask_grupo, mask_nao=mask_nao)
 
     # SEÇÃO 3: GAP de Oportunidades
-    render_secao3_gap_oportunidades(df)
+    render_secao3_gap_oportunidades(df, mask_grupo=mask_grupo, mask_nao=mask_nao)
 
 
 # =====================================================================
 # SIMULAÇÃO DE POTENCIAL
 # =====================================================================
 
-def create_simulacao_filters(df: pd.DataFrame) -> Dict:
+def create_simulacao_filters(df: pd.DataFrame, options: Dict = None) -> Dict:
     """
     Constrói filtros específicos para simulação (10 filtros)
 
     Args:
         df: DataFrame completo
+        options: Opções dos filtros (calculate_filter_options); se None,
+            são calculadas a partir de df
 
     Returns:
         Dicionário com valores dos filtros selecionados
@@ -1304,16 +1947,18 @@ def create_simulacao_filters(df: pd.DataFrame) -> Dict:
     st.sidebar.markdown("---")
     st.sidebar.header("🔍 Filtros de Simulação")
 
+    if options is None:
+        options = calculate_filter_options(df)
+
     filters = {}
 
     # ===== FILTROS GEOGRÁFICOS =====
     with st.sidebar.expander("📍 Filtros Geográficos", expanded=True):
         # Filtro: UF
         if 'uf' in df.columns:
-            ufs = sorted(df['uf'].dropna().unique())
             filters['uf'] = st.multiselect(
                 "Estado (UF)",
-                options=ufs,
+                options=options['uf'],
                 default=[],
                 key="sim_filter_uf"
             )
@@ -1324,10 +1969,9 @@ def create_simulacao_filters(df: pd.DataFrame) -> Dict:
     with st.sidebar.expander("🏢 Filtros de Negócio", expanded=True):
         # Filtro: TEC
         if 'tec' in df.columns:
-            tec_options = sorted(df['tec'].dropna().unique())
             filters['tec'] = st.multiselect(
                 "TEC (Estratégia)",
-                options=tec_options,
+                options=options['tec'],
                 default=[],
                 help="TEC01=cliente atual, TEC02=foco alto, TEC03=foco médio",
                 key="sim_filter_tec"
@@ -1337,12 +1981,9 @@ def create_simulacao_filters(df: pd.DataFrame) -> Dict:
 
         # Filtro: Grupo (excluindo NA/FORA)
         if 'pai' in df.columns:
-            grupos = sorted(
-                df[~df['pai'].isin(['NA', 'FORA', 'na', 'fora', ''])]['pai'].dropna().unique()
-            )
             filters['pai'] = st.multiselect(
                 "Grupo/Holding",
-                options=grupos,
+                options=options['pai'],
                 default=[],
                 help="Grupos NA e FORA excluídos das opções",
                 key="sim_filter_pai"
@@ -1378,10 +2019,9 @@ def create_simulacao_filters(df: pd.DataFrame) -> Dict:
 
         # Filtro: Terceiriza Lavra
         if 'terceiriza_lavra?' in df.columns:
-            terceiriza_options = sorted(df['terceiriza_lavra?'].dropna().unique())
             filters['terceiriza'] = st.multiselect(
                 "Terceiriza Lavra?",
-                options=terceiriza_options,
+                options=options['terceiriza'],
                 default=[],
                 key="sim_filter_terceiriza"
             )
@@ -1392,10 +2032,9 @@ def create_simulacao_filters(df: pd.DataFrame) -> Dict:
     with st.sidebar.expander("⛏️ Filtros Técnicos", expanded=True):
         # Filtro: Substância
         if 'substanciamaiscomercializada' in df.columns:
-            substancias = sorted(df['substanciamaiscomercializada'].dropna().unique())
             filters['substancia'] = st.multiselect(
                 "Substância Mineral",
-                options=substancias,
+                options=options['substancia'],
                 default=[],
                 key="sim_filter_substancia"
             )
@@ -1404,12 +2043,9 @@ def create_simulacao_filters(df: pd.DataFrame) -> Dict:
 
         # Filtro: Porte da Mina por Quartis (NOVO)
         if 'totalvalorrecolhido' in df.columns:
-            # Calcula quartis (apenas valores > 0)
-            df_valores_positivos = df[df['totalvalorrecolhido'] > 0]
-            if len(df_valores_positivos) > 0:
-                q25 = df_valores_positivos['totalvalorrecolhido'].quantile(0.25)
-                q50 = df_valores_positivos['totalvalorrecolhido'].quantile(0.50)
-                q75 = df_valores_positivos['totalvalorrecolhido'].quantile(0.75)
+            # Quartis (apenas valores > 0), calculados com as opções
+            if options['cfem_quartis'] is not None:
+                q25, q50, q75 = options['cfem_quartis']
 
                 porte_options = [
                     f"🟢 Pequeno (até {format_currency_abbreviated(q25)})",
@@ -1425,16 +2061,18 @@ def create_simulacao_filters(df: pd.DataFrame) -> Dict:
                     help="Classificação baseada em quartis do CFEM",
                     key="sim_filter_porte"
                 )
-                # Guarda quartis para uso posterior
+                # Guarda quartis e a faixa (0-3) de cada porte selecionado
                 filters['quartis'] = (q25, q50, q75)
+                filters['porte_codes'] = [porte_options.index(label) for label in filters['porte']]
             else:
                 filters['porte'] = []
+                filters['porte_codes'] = []
                 filters['quartis'] = None
 
         # Filtro: Faixa CFEM
         if 'totalvalorrecolhido' in df.columns:
-            cfem_min = float(df['totalvalorrecolhido'].min())
-            cfem_max = float(df['totalvalorrecolhido'].max())
+            cfem_min = options['cfem_min']
+            cfem_max = options['cfem_max']
 
             if cfem_min < cfem_max:
                 filters['cfem_range'] = st.slider(
@@ -1456,21 +2094,15 @@ def create_simulacao_filters(df: pd.DataFrame) -> Dict:
     col1, col2 = st.sidebar.columns(2)
 
     with col1:
-        if st.button("✅ Todos", use_container_width=True, key="sim_btn_todos"):
-            # Preenche todos os filtros
-            if 'uf' in df.columns:
-                st.session_state.sim_filter_uf = sorted(df['uf'].dropna().unique())
-            if 'tec' in df.columns:
-                st.session_state.sim_filter_tec = sorted(df['tec'].dropna().unique())
-            if 'pai' in df.columns:
-                st.session_state.sim_filter_pai = sorted(
-                    df[~df['pai'].isin(['NA', 'FORA', 'na', 'fora', ''])]['pai'].dropna().unique()
-                )
-            if 'terceiriza_lavra?' in df.columns:
-                st.session_state.sim_filter_terceiriza = sorted(df['terceiriza_lavra?'].dropna().unique())
-            if 'substanciamaiscomercializada' in df.columns:
-                st.session_state.sim_filter_substancia = sorted(df['substanciamaiscomercializada'].dropna().unique())
-            st.rerun()
+        # Preenche todos os filtros com as mesmas listas de opções dos
+        # widgets; via callback, que roda antes dos multiselects existirem
+        st.button(
+            "✅ Todos",
+            use_container_width=True,
+            key="sim_btn_todos",
+            on_click=_select_all_filters,
+            args=(options, 'sim_filter_')
+        )
 
     with col2:
         if st.button("🔄 Resetar", use_container_width=True, key="sim_btn_resetar"):
@@ -1487,6 +2119,10 @@ def apply_simulacao_filters(df: pd.DataFrame, filters: Dict) -> pd.DataFrame:
     """
     Aplica filtros ao DataFrame para simulação
 
+    Como em apply_filters, os filtros são combinados em uma única máscara
+    booleana e o DataFrame é indexado uma só vez no final (sem cópia quando
+    nada é removido); o resultado deve ser tratado como somente leitura.
+
     Args:
         df: DataFrame completo
         filters: Dicionário com valores dos filtros
@@ -1494,88 +2130,94 @@ def apply_simulacao_filters(df: pd.DataFrame, filters: Dict) -> pd.DataFrame:
     Returns:
         DataFrame filtrado
     """
-    result = df.copy()
+    mask = np.ones(len(df), dtype=bool)
 
     # Filtro TEC
     if filters.get('tec') and len(filters['tec']) > 0:
-        result = result[result['tec'].isin(filters['tec'])]
+        mask &= _isin_mask(df['tec'], filters['tec'])
 
     # Filtro UF
     if filters.get('uf') and len(filters['uf']) > 0:
-        result = result[result['uf'].isin(filters['uf'])]
+        mask &= _isin_mask(df['uf'], filters['uf'])
 
     # Filtro Grupo (sempre mantém NA/FORA independente do filtro)
     if filters.get('pai') and len(filters['pai']) > 0:
-        grupos_permitidos = filters['pai'] + ['NA', 'FORA', 'na', 'fora', 'Na', 'Fora']
-        result = result[
-            result['pai'].isin(grupos_permitidos) |
-            result['pai'].isna() |
-            (result['pai'] == '')
-        ]
+        grupos_permitidos = [*filters['pai'], *PAI_SEMPRE_MANTIDOS]
+        mask &= _isin_mask(df['pai'], grupos_permitidos) | df['pai'].isna().to_numpy()
 
     # Filtro Possui Grupo (NOVO)
     if filters.get('possui_grupo') and len(filters['possui_grupo']) > 0:
         if 'Com Grupo' in filters['possui_grupo'] and 'Sem Grupo' not in filters['possui_grupo']:
             # Apenas com grupo
-            result = result[
-                ~result['pai'].isin(['NA', 'FORA', 'na', 'fora', '']) &
-                result['pai'].notna()
-            ]
+            mask &= mask_com_grupo(df)
         elif 'Sem Grupo' in filters['possui_grupo'] and 'Com Grupo' not in filters['possui_grupo']:
             # Apenas sem grupo
-            result = result[
-                result['pai'].isin(['NA', 'FORA', 'na', 'fora', '']) |
-                result['pai'].isna()
-            ]
+            mask &= ~mask_com_grupo(df)
 
     # Filtro Status Mapeamento
     if filters.get('status_mapeamento') and len(filters['status_mapeamento']) > 0:
-        result = result[result['status_mapeamento'].isin(filters['status_mapeamento'])]
+        mask &= _isin_mask(df['status_mapeamento'], filters['status_mapeamento'])
 
     # Filtro Substância
     if filters.get('substancia') and len(filters['substancia']) > 0:
-        result = result[result['substanciamaiscomercializada'].isin(filters['substancia'])]
+        mask &= _isin_mask(df['substanciamaiscomercializada'], filters['substancia'])
 
     # Filtro Terceiriza
     if filters.get('terceiriza') and len(filters['terceiriza']) > 0:
-        result = result[result['terceiriza_lavra?'].isin(filters['terceiriza'])]
+        mask &= _isin_mask(df['terceiriza_lavra?'], filters['terceiriza'])
 
     # Filtro Porte (NOVO)
-    if filters.get('porte') and len(filters['porte']) > 0 and filters.get('quartis'):
-        q25, q50, q75 = filters['quartis']
-        porte_masks = []
-
-        for porte_label in filters['porte']:
-            if '🟢 Pequeno' in porte_label:
-                porte_masks.append(result['totalvalorrecolhido'] <= q25)
-            elif '🟡 Médio-Baixo' in porte_label:
-                porte_masks.append(
-                    (result['totalvalorrecolhido'] > q25) &
-                    (result['totalvalorrecolhido'] <= q50)
-                )
-            elif '🟠 Médio-Alto' in porte_label:
-                porte_masks.append(
-                    (result['totalvalorrecolhido'] > q50) &
-                    (result['totalvalorrecolhido'] <= q75)
-                )
-            elif '🔴 Grande' in porte_label:
-                porte_masks.append(result['totalvalorrecolhido'] > q75)
-
-        if porte_masks:
-            combined_mask = porte_masks[0]
-            for mask in porte_masks[1:]:
-                combined_mask = combined_mask | mask
-            result = result[combined_mask]
+    if filters.get('porte_codes') and filters.get('quartis'):
+        # Faixa de cada mina: 0 = até q25, 1 = (q25, q50], 2 = (q50, q75],
+        # 3 = acima de q75; um único digitize + isin sobre o array
+        cfem = df['totalvalorrecolhido'].to_numpy()
+        faixas = np.digitize(cfem, filters['quartis'], right=True)
+        mask &= np.isin(faixas, filters['porte_codes'])
+        # CFEM nulo não pertence a nenhuma faixa (digitize o põe na última)
+        mask &= ~np.isnan(cfem)
 
     # Filtro Faixa CFEM
-    if filters.get('cfem_range') and 'totalvalorrecolhido' in result.columns:
+    if filters.get('cfem_range') and 'totalvalorrecolhido' in df.columns:
         cfem_min, cfem_max = filters['cfem_range']
-        result = result[
-            (result['totalvalorrecolhido'] >= cfem_min) &
-            (result['totalvalorrecolhido'] <= cfem_max)
-        ]
+        cfem = df['totalvalorrecolhido'].to_numpy()
+        mask &= cfem >= cfem_min
+        mask &= cfem <= cfem_max
+
+    # Sem linhas removidas (estado padrão dos filtros): evita copiar o DataFrame
+    if mask.all():
+        return df
+
+    return df[mask]
 
-    return result
+
+def _simulacao_filtrada(df: pd.DataFrame, filters: Dict, cache_key: str = None) -> pd.DataFrame:
+    """
+    apply_simulacao_filters reaproveitando o último resultado
+
+    O recorte filtrado fica no session state junto com a chave (dataset +
+    filtros): reruns que não mudam os filtros (Simular, % de captura)
+    devolvem o mesmo DataFrame. Não usa st.cache_data porque ele copia o
+    DataFrame de retorno a cada leitura, o que custa tanto quanto filtrar.
+
+    Args:
+        df: DataFrame completo
+        filters: Dicionário com valores dos filtros
+        cache_key: Hash do dataset; se None, sempre refiltra
+
+    Returns:
+        DataFrame filtrado (somente leitura)
+    """
+    if cache_key is None:
+        return apply_simulacao_filters(df, filters)
+
+    filters_key = (cache_key, tuple(sorted(filters.items())))
+    cached = st.session_state.get('simulacao_filtrada')
+    if cached is not None and cached[0] == filters_key:
+        return cached[1]
+
+    df_filtered = apply_simulacao_filters(df, filters)
+    st.session_state.simulacao_filtrada = (filters_key, df_filtered)
+    return df_filtered
 
 
 def render_cards_referencia_simulacao(df_total: pd.DataFrame, df_filtered: pd.DataFrame) -> None:
@@ -1617,11 +2259,10 @@ def render_cards_referencia_simulacao(df_total: pd.DataFrame, df_filtered: pd.Da
 
     # Card 3: Distribuição por TEC
     if 'tec' in df_filtered.columns:
-        # Filtrar apenas TEC01, TEC02, TEC03 e ordenar corretamente
+        # Contagem de TEC01, TEC02 e TEC03, nessa ordem
         tecs_prioritarios = ['TEC01', 'TEC02', 'TEC03']
-        df_tec_filtrado = df_filtered[df_filtered['tec'].isin(tecs_prioritarios)]
-        tec_counts = df_tec_filtrado['tec'].value_counts().reindex(tecs_prioritarios, fill_value=0)
-        tec_text = " | ".join([f"{tec}: {count}" for tec, count in tec_counts.items()])
+        tec_counts = count_values(df_filtered['tec'], tecs_prioritarios)
+        tec_text = " | ".join([f"{tec}: {count}" for tec, count in zip(tecs_prioritarios, tec_counts)])
     else:
         tec_text = "N/A"
 
@@ -1632,9 +2273,12 @@ def render_cards_referencia_simulacao(df_total: pd.DataFrame, df_filtered: pd.Da
         )
         st.markdown('<p style="margin: 0; color: #2D3142; font-size: 0.95rem;">Quantidade de minas por estratégia</p>', unsafe_allow_html=True)
 
+    # Máscara das minas mapeadas (reusada pelos cards seguintes)
+    mask_sim = (df_filtered['status_mapeamento'] == 'Sim').to_numpy() if 'status_mapeamento' in df_filtered.columns else None
+
     # Card 4: Minas Mapeadas
-    if 'status_mapeamento' in df_filtered.columns:
-        minas_mapeadas = len(df_filtered[df_filtered['status_mapeamento'] == 'Sim'])
+    if mask_sim is not None:
+        minas_mapeadas = int(np.count_nonzero(mask_sim))
         perc_mapeadas = (minas_mapeadas / total_minas * 100) if total_minas > 0 else 0
     else:
         minas_mapeadas = 0
@@ -1651,14 +2295,15 @@ def render_cards_referencia_simulacao(df_total: pd.DataFrame, df_filtered: pd.Da
     col1, col2, col3, col4 = st.columns(4)
 
     # Card 5: Valor Anual Mapeado
-    if 'valor_anual_mapeado' in df_filtered.columns and 'status_mapeamento' in df_filtered.columns:
-        valor_anual_mapeado = df_filtered[df_filtered['status_mapeamento'] == 'Sim']['valor_anual_mapeado'].sum()
+    if 'valor_anual_mapeado' in df_filtered.columns and mask_sim is not None:
+        valor_anual_mapeadas = df_filtered['valor_anual_mapeado'][mask_sim]
+        valor_anual_mapeado = valor_anual_mapeadas.sum()
     else:
+        valor_anual_mapeadas = None
         valor_anual_mapeado = 0
 
     # Cálculo do Ticket Médio de Valor Anual das Mapeadas
-    df_mapeadas_base = df_filtered[df_filtered['status_mapeamento'] == 'Sim'] if 'status_mapeamento' in df_filtered.columns else pd.DataFrame()
-    ticket_medio_valor_anual_ref = df_mapeadas_base['valor_anual_mapeado'].mean() if len(df_mapeadas_base) > 0 and 'valor_anual_mapeado' in df_mapeadas_base.columns else 0
+    ticket_medio_valor_anual_ref = valor_anual_mapeadas.mean() if valor_anual_mapeadas is not None and len(valor_anual_mapeadas) > 0 else 0
 
     with col1:
         st.metric(
@@ -1677,8 +2322,8 @@ def render_cards_referencia_simulacao(df_total: pd.DataFrame, df_filtered: pd.Da
         st.markdown('<p style="margin: 0; color: #2D3142; font-size: 0.95rem;">Valor anual médio por mina</p>', unsafe_allow_html=True)
 
     # Card 7: Taxa de Valor Mapeado (Indicador 4)
-    if 'status_mapeamento' in df_filtered.columns and 'totalvalorrecolhido' in df_filtered.columns:
-        cfem_mapeadas = df_filtered[df_filtered['status_mapeamento'] == 'Sim']['totalvalorrecolhido'].sum()
+    if mask_sim is not None and 'totalvalorrecolhido' in df_filtered.columns:
+        cfem_mapeadas = df_filtered['totalvalorrecolhido'][mask_sim].sum()
         taxa_valor = (valor_anual_mapeado / cfem_mapeadas * 100) if cfem_mapeadas > 0 else 0
     else:
         taxa_valor = 0
@@ -1692,14 +2337,13 @@ def render_cards_referencia_simulacao(df_total: pd.DataFrame, df_filtered: pd.Da
         st.markdown('<p style="margin: 0; color: #2D3142; font-size: 0.95rem;">Relação Valor/CFEM nas mapeadas</p>', unsafe_allow_html=True)
 
     # Card 7: Taxa TEC01 (Indicador 5)
-    if 'tec' in df_filtered.columns and 'status_mapeamento' in df_filtered.columns:
-        df_tec01 = df_filtered[
-            (df_filtered['tec'] == 'TEC01') &
-            (df_filtered['status_mapeamento'] == 'Sim')
-        ]
-        if len(df_tec01) > 0:
-            cfem_tec01 = df_tec01['totalvalorrecolhido'].sum() if 'totalvalorrecolhido' in df_tec01.columns else 0
-            valor_tec01 = df_tec01['valor_anual_mapeado'].sum() if 'valor_anual_mapeado' in df_tec01.columns else 0
+    # (uma máscara TEC01 mapeadas para a taxa e para a validação)
+    mask_tec01 = ((df_filtered['tec'] == 'TEC01').to_numpy() & mask_sim) if 'tec' in df_filtered.columns and mask_sim is not None else None
+    if mask_tec01 is not None:
+        num_minas_tec01 = int(np.count_nonzero(mask_tec01))
+        if num_minas_tec01 > 0:
+            cfem_tec01 = df_filtered['totalvalorrecolhido'][mask_tec01].sum() if 'totalvalorrecolhido' in df_filtered.columns else 0
+            valor_tec01 = df_filtered['valor_anual_mapeado'][mask_tec01].sum() if 'valor_anual_mapeado' in df_filtered.columns else 0
             taxa_tec01 = (valor_tec01 / cfem_tec01 * 100) if cfem_tec01 > 0 else 0
         else:
             taxa_tec01 = 0
@@ -1707,13 +2351,7 @@ def render_cards_referencia_simulacao(df_total: pd.DataFrame, df_filtered: pd.Da
         taxa_tec01 = 0
 
     # Validações para display
-    if 'tec' in df_filtered.columns and 'status_mapeamento' in df_filtered.columns:
-        df_tec01_count = df_filtered[
-            (df_filtered['tec'] == 'TEC01') &
-            (df_filtered['status_mapeamento'] == 'Sim')
-        ]
-        num_minas_tec01 = len(df_tec01_count)
-
+    if mask_tec01 is not None:
         if num_minas_tec01 < 5:
             taxa_tec01_display = "N/A"
             taxa_tec01_help = f"Amostra pequena ({num_minas_tec01} minas TEC01). Mínimo recomendado: 5 minas"
@@ -1755,25 +2393,78 @@ def render_configuracao_simulacao() -> None:
             help="Percentual do CFEM a capturar. Pode ser > 100% se a taxa de conversão for alta (ex: 973% da Taxa TEC01)."
         )
 
+    # Callbacks (on_click) em vez de st.rerun(): dentro do fragmento da
+    # simulação o clique reexecuta só o fragmento, não a página inteira
     with col2:
-        if st.button("🚀 Simular", type="primary", use_container_width=True, key="btn_simular"):
-            st.session_state.simulacao_executada = True
-            st.rerun()
+        st.button("🚀 Simular", type="primary", use_container_width=True, key="btn_simular",
+                  on_click=_executar_simulacao)
 
     with col3:
-        if st.button("🔄 Resetar", use_container_width=True, key="btn_resetar_sim"):
-            st.session_state.simulacao_executada = False
-            if 'percentual_simulacao' in st.session_state:
-                del st.session_state.percentual_simulacao
-            st.rerun()
+        st.button("🔄 Resetar", use_container_width=True, key="btn_resetar_sim",
+                  on_click=_resetar_simulacao)
+
+
+def _executar_simulacao() -> None:
+    """Callback do botão Simular"""
+    st.session_state.simulacao_executada = True
+
+
+def _resetar_simulacao() -> None:
+    """Callback do botão Resetar: oculta resultados e volta o % ao padrão"""
+    st.session_state.simulacao_executada = False
+    if 'percentual_simulacao' in st.session_state:
+        del st.session_state.percentual_simulacao
+
+
+def top_prioridade_simulacao(df_filtered: pd.DataFrame, n: int = 50) -> pd.DataFrame:
+    """
+    TOP N minas não mapeadas da base filtrada por score de prioridade
+
+    Calculado uma vez por rerun e compartilhado pelos resultados e pela
+    tabela da simulação. O score é calculado como array e só as N linhas
+    selecionadas são materializadas (as não mapeadas não são copiadas).
+
+    Args:
+        df_filtered: DataFrame filtrado
+        n: Quantidade de minas
+
+    Returns:
+        DataFrame com as colunas tec_weight e score_prioridade, em ordem
+        decrescente de score (vazio se todas estiverem mapeadas)
+    """
+    # Filtra apenas NÃO MAPEADAS (somente leitura, sem cópia)
+    if 'status_mapeamento' in df_filtered.columns:
+        df_nao_mapeadas = df_filtered[df_filtered['status_mapeamento'] == 'Não']
+    else:
+        df_nao_mapeadas = df_filtered
+
+    # Calcula score de prioridade (CFEM × Peso TEC)
+    if 'tec' in df_nao_mapeadas.columns:
+        tec_weight = tec_weight_series(df_nao_mapeadas['tec']).to_numpy()
+    else:
+        tec_weight = np.zeros(len(df_nao_mapeadas), dtype='int64')
+
+    if 'totalvalorrecolhido' in df_nao_mapeadas.columns:
+        score = df_nao_mapeadas['totalvalorrecolhido'].to_numpy() * tec_weight
+    else:
+        score = np.zeros(len(df_nao_mapeadas), dtype='int64')
+
+    # TOP N (ou todas se < N) por seleção parcial do score
+    positions = _top_n_positions(score, n)
+    return df_nao_mapeadas.take(positions).assign(
+        tec_weight=tec_weight[positions],
+        score_prioridade=score[positions]
+    )
 
 
-def render_resultados_simulacao(df_filtered: pd.DataFrame) -> None:
+def render_resultados_simulacao(df_filtered: pd.DataFrame, df_top: pd.DataFrame = None) -> None:
     """
     Renderiza resultados da simulação (4 cards)
 
     Args:
         df_filtered: DataFrame filtrado
+        df_top: TOP 50 prioritárias (top_prioridade_simulacao); se None,
+            é calculado aqui
     """
     st.subheader("💰 Resultados da Simulação")
 
@@ -1784,27 +2475,15 @@ def render_resultados_simulacao(df_filtered: pd.DataFrame) -> None:
     valor_mensal_simulado = valor_anual_simulado / 12
 
     # Ticket Médio do Potencial Anual Simulado (TOP 50 por Score)
-    df_nao_mapeadas = df_filtered[df_filtered['status_mapeamento'] == 'Não'].copy() if 'status_mapeamento' in df_filtered.columns else df_filtered.copy()
-
-    if len(df_nao_mapeadas) > 0:
-        # Calcular score de prioridade (CFEM × Peso TEC)
-        if 'tec' in df_nao_mapeadas.columns:
-            df_nao_mapeadas['tec_weight'] = df_nao_mapeadas['tec'].apply(calculate_tec_weight)
-        else:
-            df_nao_mapeadas['tec_weight'] = 1
-
-        if 'totalvalorrecolhido' in df_nao_mapeadas.columns:
-            df_nao_mapeadas['score_prioridade'] = df_nao_mapeadas['totalvalorrecolhido'] * df_nao_mapeadas['tec_weight']
-        else:
-            df_nao_mapeadas['score_prioridade'] = 0
+    if df_top is None:
+        df_top = top_prioridade_simulacao(df_filtered)
 
-        # Pegar TOP 50 (ou todas se < 50)
-        num_top = min(50, len(df_nao_mapeadas))
-        df_top_prioridade = df_nao_mapeadas.nlargest(num_top, 'score_prioridade')
+    if len(df_top) > 0:
+        num_top = len(df_top)
 
         # Calcular potencial das TOP minas prioritárias
-        if 'totalvalorrecolhido' in df_top_prioridade.columns:
-            cfem_top = df_top_prioridade['totalvalorrecolhido'].sum()
+        if 'totalvalorrecolhido' in df_top.columns:
+            cfem_top = df_top['totalvalorrecolhido'].sum()
             potencial_top = cfem_top * percentual
             ticket_medio_potencial = potencial_top / num_top
         else:
@@ -1858,40 +2537,47 @@ def render_resultados_simulacao(df_filtered: pd.DataFrame) -> None:
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def render_tabela_simulacao(df_filtered: pd.DataFrame) -> None:
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_csv_simulacao(cache_key: tuple, percentual: float, _df_top50: pd.DataFrame) -> bytes:
+    """
+    CSV de exportação do TOP 50 em cache por dataset + filtros + % de captura
+
+    Args:
+        cache_key: Hash do dataset + filtros da simulação (chave do cache)
+        percentual: Fração do CFEM capturada (chave do cache)
+        _df_top50: TOP 50 com as colunas de potencial (não entra no hash)
+
+    Returns:
+        Conteúdo do CSV (separador ';') em UTF-8 com BOM
+    """
+    return _df_top50.to_csv(sep=';', index=False).encode('utf-8-sig')
+
+
+def render_tabela_simulacao(df_filtered: pd.DataFrame, df_top: pd.DataFrame = None,
+                            cache_key: tuple = None) -> None:
     """
     Renderiza tabela TOP 50 minas prioritárias não mapeadas
 
     Args:
         df_filtered: DataFrame filtrado
+        df_top: TOP 50 prioritárias (top_prioridade_simulacao); se None,
+            é calculado aqui
+        cache_key: Hash do dataset + filtros; se informado, o CSV de
+            exportação fica em cache por chave e % de captura
     """
     from datetime import datetime
 
     st.subheader("📋 TOP 50 Minas Prioritárias - Potencial Simulado")
 
-    # Filtra apenas NÃO MAPEADAS
-    if 'status_mapeamento' in df_filtered.columns:
-        df_nao_mapeadas = df_filtered[df_filtered['status_mapeamento'] == 'Não'].copy()
-    else:
-        df_nao_mapeadas = df_filtered.copy()
+    # TOP 50 não mapeadas por score (cópia: recebe as colunas de potencial)
+    if df_top is None:
+        df_top = top_prioridade_simulacao(df_filtered)
 
-    if len(df_nao_mapeadas) == 0:
+    if len(df_top) == 0:
         st.info("✅ Todas as minas da base filtrada estão mapeadas!")
         return
 
-    # Calcula score de prioridade
-    if 'tec' in df_nao_mapeadas.columns:
-        df_nao_mapeadas['tec_weight'] = df_nao_mapeadas['tec'].apply(calculate_tec_weight)
-    else:
-        df_nao_mapeadas['tec_weight'] = 0
-
-    if 'totalvalorrecolhido' in df_nao_mapeadas.columns:
-        df_nao_mapeadas['score_prioridade'] = df_nao_mapeadas['totalvalorrecolhido'] * df_nao_mapeadas['tec_weight']
-    else:
-        df_nao_mapeadas['score_prioridade'] = 0
-
-    # Ordena e pega TOP 50
-    df_top50 = df_nao_mapeadas.nlargest(50, 'score_prioridade').copy()
+    df_top50 = df_top.copy()
 
     # Calcula potencial
     percentual = st.session_state.get('percentual_simulacao', 30.0) / 100
@@ -1913,38 +2599,29 @@ def render_tabela_simulacao(df_filtered: pd.DataFrame) -> None:
 
     st.markdown("---")
 
-    # Prepara tabela (10 colunas)
-    tabela_data = []
-    for idx, row in enumerate(df_top50.itertuples(), 1):
-        # Identifica nome da mina
-        if hasattr(row, 'chaveprimaria'):
-            nome_mina = str(row.chaveprimaria)[:40]
-        elif hasattr(row, 'empresa_por_cnpj'):
-            nome_mina = str(row.empresa_por_cnpj)[:40]
-        else:
-            nome_mina = 'N/A'
-
-        tabela_data.append({
-            '#': idx,
-            'Mina': nome_mina,
-            'Grupo': str(getattr(row, 'pai', 'N/A'))[:25],
-            'UF': getattr(row, 'uf', 'N/A'),
-            'Município': str(getattr(row, 'município', 'N/A'))[:25],
-            'Substância': str(getattr(row, 'substanciamaiscomercializada', 'N/A'))[:20],
-            'CFEM 2024': format_currency_abbreviated(getattr(row, 'totalvalorrecolhido', 0)),
-            'TEC': getattr(row, 'tec', 'N/A'),
-            'Score': f"{getattr(row, 'score_prioridade', 0):,.0f}".replace(',', '.'),
-            'Pot. Mensal': format_currency_abbreviated(getattr(row, 'potencial_mensal', 0)),
-            'Pot. Anual': format_currency_abbreviated(getattr(row, 'potencial_anual', 0))
-        })
-
-    df_tabela = pd.DataFrame(tabela_data)
+    # Prepara tabela (11 colunas, montadas por coluna)
+    df_tabela = pd.DataFrame({
+        '#': np.arange(1, len(df_top50) + 1),
+        'Mina': _table_text(df_top50, _chave_column(df_top50), 40),
+        'Grupo': _table_text(df_top50, 'pai', 25),
+        'UF': _table_values(df_top50, 'uf'),
+        'Município': _table_text(df_top50, 'município', 25),
+        'Substância': _table_text(df_top50, 'substanciamaiscomercializada', 20),
+        'CFEM 2024': _table_currency(df_top50, 'totalvalorrecolhido'),
+        'TEC': _table_values(df_top50, 'tec'),
+        'Score': _table_score(df_top50),
+        'Pot. Mensal': _table_currency(df_top50, 'potencial_mensal'),
+        'Pot. Anual': _table_currency(df_top50, 'potencial_anual')
+    })
 
     # Exibe tabela
     st.dataframe(df_tabela, use_container_width=True, height=500)
 
     # Botão de exportação
-    csv_data = df_top50.to_csv(sep=';', index=False, encoding='utf-8-sig')
+    if cache_key is not None:
+        csv_data = _cached_csv_simulacao(cache_key, percentual, df_top50)
+    else:
+        csv_data = df_top50.to_csv(sep=';', index=False).encode('utf-8-sig')
     st.download_button(
         label="📥 Exportar Simulação (CSV)",
         data=csv_data,
@@ -1961,20 +2638,24 @@ def render_tabela_simulacao(df_filtered: pd.DataFrame) -> None:
     """)
 
 
-def render_simulacao_section(df: pd.DataFrame) -> None:
+def render_simulacao_section(df: pd.DataFrame, options: Dict = None, cache_key: str = None) -> None:
     """
     Renderiza página completa de Simulação de Potencial
 
     Args:
         df: DataFrame completo
+        options: Opções dos filtros (calculate_filter_options); se None,
+            são calculadas a partir de df
+        cache_key: Hash do dataset; se informado, o recorte filtrado é
+            reaproveitado enquanto os filtros não mudam
     """
     st.title("📊 Simulação de Potencial")
     st.markdown("Projete cenários de captura de mercado e estime o potencial de receita")
     st.markdown("---")
 
     # Aplica filtros da sidebar
-    filters = create_simulacao_filters(df)
-    df_filtered = apply_simulacao_filters(df, filters)
+    filters = create_simulacao_filters(df, options=options)
+    df_filtered = _simulacao_filtrada(df, filters, cache_key=cache_key)
 
     # Validação
     if len(df_filtered) == 0:
@@ -1996,12 +2677,35 @@ def render_simulacao_section(df: pd.DataFrame) -> None:
 
     st.markdown("---")
 
+    # Seções 2 a 4: configuração e resultados
+    export_key = None if cache_key is None else (cache_key, tuple(sorted(filters.items())))
+    _render_simulacao_interativa(df_filtered, cache_key=export_key)
+
+
+@st.fragment
+def _render_simulacao_interativa(df_filtered: pd.DataFrame, cache_key: tuple = None) -> None:
+    """
+    Configuração e resultados da simulação, em um fragmento
+
+    Mudar o % de captura ou clicar em Simular/Resetar reexecuta só este
+    fragmento: filtros, recorte e cards de referência não são refeitos.
+    Sem simulação executada, nada além da configuração é calculado.
+
+    Args:
+        df_filtered: DataFrame filtrado da simulação
+        cache_key: Hash do dataset + filtros; se informado, o CSV de
+            exportação é reaproveitado enquanto filtros e % não mudam
+    """
     # Seção 2: Configuração da Simulação
     render_configuracao_simulacao()
 
     # Seção 3 e 4: Resultados (apenas se simulação executada)
-    if st.session_state.get('simulacao_executada', False):
-        st.markdown("---")
-        render_resultados_simulacao(df_filtered)
-        st.markdown("---")
-        render_tabela_simulacao(df_filtered)
+    if not st.session_state.get('simulacao_executada', False):
+        return
+
+    st.markdown("---")
+    # TOP 50 prioritárias, calculado uma vez para resultados e tabela
+    df_top = top_prioridade_simulacao(df_filtered)
+    render_resultados_simulacao(df_filtered, df_top=df_top)
+    st.markdown("---")
+    render_tabela_simulacao(df_filtered, df_top=df_top, cache_key=cache_key)
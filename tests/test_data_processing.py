@@ -0,0 +1,104 @@
+"""
+Testes da leitura do CSV (leitor PyArrow x parser C)
+"""
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from data_processing import (  # noqa: E402
+    RAW_TEXT_COLUMNS,
+    calculate_derived_fields,
+    clean_and_transform_data,
+    load_and_validate_csv
+)
+
+HEADER = (
+    'ChavePrimaria;CPF_CNPJ;EMPRESA_POR_CNPJ;Município;UF;TotalValorRecolhido;'
+    'TotalQuantidadeComercializada;SubstanciaMaisComercializada;SetorMineral;PAI;TEC;'
+    'primeiro_escopo;Duração;valor;Valor Total Mensal;Terceiriza Lavra?;CHECK2;CHECK3;'
+    'Empresa_CPF_CNPJ;CFEM (Porte);Total Escopos'
+)
+
+# Colunas numéricas só com inteiros e células vazias: o PyArrow inferia float
+# e o texto '1234.0' perdia o ponto na conversão (valor 10x maior)
+ROWS = [
+    'A1;33600000000191;Empresa A;Itabira;MG;1500;200;FERRO;Metálico;VALE;TEC01;Lavra;12;;100;Não;;;;Grande;1',
+    'A2;;Empresa B;Parauapebas;PA;;;COBRE;Metálico;;TEC02;;;;;Sim;;;;Pequeno;',
+    'A3;4512345678901;Empresa C;Ouro Preto;MG;7;3;OURO;Metálico;Na;TEC03;Lavra;6;;7;Não;;;;Médio;2',
+]
+
+
+def _csv_bytes(encoding: str = 'utf-8', header: str = HEADER, rows: list = ROWS) -> bytes:
+    return ('\n'.join([header, *rows]) + '\n').encode(encoding)
+
+
+def _with_column(name: str, values: list, header: str = HEADER) -> list:
+    """Linhas de ROWS com a coluna name substituída por values"""
+    idx = header.split(';').index(name)
+    rows = []
+    for row, value in zip(ROWS, values):
+        fields = row.split(';')
+        fields[idx] = value
+        rows.append(';'.join(fields))
+    return rows
+
+
+def _read_c_engine(raw: bytes) -> pd.DataFrame:
+    df = pd.read_csv(io.BytesIO(raw), delimiter=';', encoding='utf-8-sig', dtype=RAW_TEXT_COLUMNS)
+    return df.dropna(how='all')
+
+
+# Cabeçalho com nome repetido: o parser C renomeia a cópia para 'valor.1'
+DUPLICATE_HEADER = HEADER.replace(';Valor Total Mensal;', ';valor;')
+
+
+@pytest.mark.parametrize('raw', [
+    _csv_bytes(),
+    # Datas e horas ISO continuam texto, como no parser C
+    _csv_bytes(rows=_with_column('Duração', ['2024-01-05', '2024-02-10', ''])),
+    _csv_bytes(rows=_with_column('CHECK2', ['12:30', '08:00', ''])),
+    _csv_bytes(header=DUPLICATE_HEADER),
+], ids=['padrao', 'data', 'hora', 'cabecalho_repetido'])
+def test_arrow_reader_matches_c_engine(raw):
+    pd.testing.assert_frame_equal(load_and_validate_csv(io.BytesIO(raw)), _read_c_engine(raw))
+
+
+def test_duplicate_header_loads():
+    raw = _csv_bytes(header=DUPLICATE_HEADER)
+    df = calculate_derived_fields(clean_and_transform_data(load_and_validate_csv(io.BytesIO(raw))))
+    assert 'valor.1' in df.columns
+
+
+@pytest.mark.parametrize('values, expected', [
+    # Coluna numérica: só conversão para float (ponto é decimal)
+    (['1500.75', '20.5', ''], [1500.75, 20.5, np.nan]),
+    (['1.500', '2', ''], [1.5, 2.0, np.nan]),
+    # Coluna de texto em formato brasileiro: troca de separadores
+    (['1.234,56', '10', ''], [1234.56, 10.0, np.nan]),
+    (['1.500.000', '2,5', ''], [1500000.0, 2.5, np.nan]),
+], ids=['ponto_decimal', 'ponto_decimal_sem_milhar', 'brasileiro', 'brasileiro_milhar'])
+def test_value_column_formats(values, expected):
+    for encoding in ('utf-8', 'latin-1'):
+        raw = _csv_bytes(encoding, rows=_with_column('TotalValorRecolhido', values))
+        df = clean_and_transform_data(load_and_validate_csv(io.BytesIO(raw)))
+        np.testing.assert_array_equal(df['totalvalorrecolhido'].to_numpy(), expected)
+
+
+def test_integer_columns_with_blanks_keep_their_values():
+    df = calculate_derived_fields(clean_and_transform_data(load_and_validate_csv(io.BytesIO(_csv_bytes()))))
+
+    np.testing.assert_array_equal(df['valor_total_mensal'].to_numpy(), [100.0, np.nan, 7.0])
+    np.testing.assert_array_equal(df['totalvalorrecolhido'].to_numpy(), [1500.0, np.nan, 7.0])
+    assert df['cpf_cnpj'].tolist() == ['33600000000191', '', '04512345678901']
+
+
+def test_utf8_and_latin1_give_same_result():
+    utf8 = clean_and_transform_data(load_and_validate_csv(io.BytesIO(_csv_bytes('utf-8'))))
+    latin1 = clean_and_transform_data(load_and_validate_csv(io.BytesIO(_csv_bytes('latin-1'))))
+    pd.testing.assert_frame_equal(utf8, latin1)